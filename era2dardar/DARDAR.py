@@ -15,6 +15,7 @@ from mpl_toolkits.basemap import Basemap
 import matplotlib.pyplot as plt
 from era2dardar.utils.seconds2datetime import seconds2datetime
 from era2dardar.utils.Z2dbZ import Z2dbZ
+from era2dardar.utils.read_rows import read_rows
 
 
 class DARDARProduct():
@@ -57,6 +58,12 @@ class DARDARProduct():
              
         self.latlims = latlims
         
+        # profiles of the selected node within latlims
+        self.index = None
+        if self.latlims is not None:
+            lat        = self.file.select('latitude').get()
+            self.index = self.node_index(lat)
+        
         if self.latitude.size == 0:
             raise Exception("No data returned, input another latlims")
             
@@ -208,57 +215,65 @@ class DARDARProduct():
             
         sds_obj = self.file.select(variable) # select sds
 
-        data = sds_obj.get() # get sds data    
+        # only the rows of the selected node are read, 
+        # height is common to all profiles   
+        index = self.index
+        if variable == "height":
+            index = None
             
-        if self.latlims is not None:
-            # subsetting  data   
-            if variable != "height":
-                lat1, lat2 = self.latlims
-                lat  = self.file.select('latitude').get()
- #               dn_flag  = self.file.select("day_night_flag").get()
+        data = read_rows(sds_obj, index) # get sds data    
                 
-
-                lat_sub = lat
+        return data
     
-    # to avoid extracting two latitudes, each from ascending and descending node  
-    # find the part of orbit with increasing latitudes            
-                
-                diff = (np.diff(lat,
-                        append = lat[-1] + lat[-1] - lat[-2]))            
-                        
-                mask1 = diff > 0 
+    def node_index(self, lat):
+        """
+        indices of the profiles in the selected node and latitude limits
+
+        Parameters
+        ----------
+        lat : np.array containing latitudes of the complete orbit
+
+        Returns
+        -------
+        np.array containing the indices of the selected profiles
+
+        """
+        lat1, lat2 = self.latlims
+
+        # to avoid extracting two latitudes, each from ascending and descending node  
+        # find the part of orbit with increasing latitudes            
         
+        diff = (np.diff(lat,
+                append = lat[-1] + lat[-1] - lat[-2]))            
                 
-                if np.all(~mask1):
-                    raise Exception("No increasing latitudes were found")
-                    
-                
-                if self.node == "A": 
-    
-                    lat_sub = lat[mask1] 
-                    inds = (lat_sub >= lat1) & (lat_sub <= lat2)                      
-                    data = data[mask1][inds]
-    
-                if self.node == "D_N":
-    
-                    lat_sub = lat[~mask1] 
-                    inds = (lat_sub >= 0) & (lat_sub <= lat2)  
-                    if np.sum(~mask1) == 0:
-                        raise Exception("No data in the NH descending pass")
-                    data  = data[~mask1][inds]      
-    
-                if self.node == "D_S":
-    
-                    lat_sub = lat[~mask1] 
-                    inds = (lat_sub >= lat1) & (lat_sub < 0)  
-                    if np.sum(~mask1) == 0:
-                        raise Exception("No data in the SH descending pass")
-                    data  = data[~mask1][inds]                  
-                           
-                    
-                
-        return data
-    
+        mask1 = diff > 0 
+        
+        if np.all(~mask1):
+            raise Exception("No increasing latitudes were found")
+            
+        if self.node == "A": 
+            rows = np.flatnonzero(mask1)
+            lat_sub = lat[rows] 
+            inds = (lat_sub >= lat1) & (lat_sub <= lat2)                      
+
+        elif self.node == "D_N":
+            rows = np.flatnonzero(~mask1)
+            if rows.size == 0:
+                raise Exception("No data in the NH descending pass")
+            lat_sub = lat[rows] 
+            inds = (lat_sub >= 0) & (lat_sub <= lat2)  
+
+        elif self.node == "D_S":
+            rows = np.flatnonzero(~mask1)
+            if rows.size == 0:
+                raise Exception("No data in the SH descending pass")
+            lat_sub = lat[rows] 
+            inds = (lat_sub >= lat1) & (lat_sub < 0)  
+            
+        else:
+            raise Exception("node should be one of 'A', 'D_N' or 'D_S'")
+            
+        return rows[inds]
         
 #     def get_data1(self, variable):
 #         """
@@ -6,30 +6,50 @@ Created on Wed Dec  2 08:58:25 2020
 Interface to download and load ERA5 data nearest to DARDAR time
 Adjusts ERA5 data to increasing latitudes
 and also
-Allows to add extra pressure layer below 1000 hPa with 
-function "add_extra_level" 
+Allows an extra pressure layer below 1000 hPa, which is added virtually 
+during interpolation, see ERA5p.extra_level
 
 The download and loading of ERA5 data uses pansat Product class "ERA5Product"
-See README to install pansat.
+See README to install pansat. Other sources of the data, e.g. synthetic data, 
+can be used with the providers in era2dardar.providers
 
 @author: inderpreet
 """
 from era2dardar.ERA5_parameters import parameters
-from pansat.products.reanalysis.era5 import ERA5Hourly
-import xarray
+from era2dardar import providers
 from era2dardar.utils.alt2pressure import pres2alt, alt2pres
 from scipy.constants import g
 import numpy as np
-from era2dardar.utils.interpolator import interpolator
+from era2dardar.utils.sceneplan import ScenePlan, is_periodic
+from era2dardar.utils.domain import boxes, stitch_lon, stitched_lon, read_window
+from era2dardar import ERA5_cache
+from era2dardar.ERA5_cache import floor_hour
+from datetime import timedelta
+from collections import OrderedDict
+import weakref
+import os
 
 
 
+def unpin_files(files):
+    """
+    releases files pinned by ERA5.load
+    """
+    for file in files:
+        ERA5_cache.unpin(file)
+
+
 class ERA5():
     """
     Downloads the required ERA5 data as per DARDAR timestamp and load the 
     required fields
     """
     
+    # opened ERA5 files with the time index of each hour, shared by all 
+    # instances, so that files of several hours are opened once
+    opened   = OrderedDict()
+    max_open = 16
+    
     
     def __init__(self, t_0, t_1,  variables, domain = None):
         """
@@ -41,6 +61,9 @@ class ERA5():
         t_1 : datetime.datetime object, end time
         parameter : string containing the longname of ERA5 field 
         to be downloaded, see  ERA5_parameters.parameters for listed parameters
+        domain : None for global data, [lat1, lat2, lon1, lon2], or a list of 
+        two such boxes east and west of the antimeridian, 
+        see utils.domain.scene_domain
         """
         
         # if parameter not in parameters:
@@ -54,256 +77,590 @@ class ERA5():
             self.shortname.append(parameters[parameter])  
             self.t_0 = t_0
             self.t_1 = t_1
+        
+        # hours of temporal interpolation, None for the hour of t_0 only
+        self.hours  = None
+        
+        # dtype of interpolation, None for float64
+        self.dtype  = None
+
+    def load(self, provider, product, cache = None, chunks = None, 
+             hours = None):
+        """
+        downloads and opens the ERA5 data of the domain with latitudes in 
+        ascending order. Domains of two boxes across the antimeridian are
+        kept as two datasets with continuous longitudes, see 
+        utils.domain.stitch_lon.
+        The files are opened lazily, fields are only read in the window of
+        the scene when interpolated, see window
+
+        Parameters
+        ----------
+        provider : data provider, see era2dardar.providers
+        product : string, "pressure" or "surface"
+        cache : ERA5cache instance, if None the file is downloaded 
+        chunks : None, or dictionary of dask chunk sizes, e.g. 
+                 {"level" : 1}, to back the fields by dask arrays. 
+                 Requires dask
+        hours : list of datetime objects, full hours to be loaded,
+                if None the hour containing t_0 is loaded
+
+        Returns
+        -------
+        list with the boxes of each hour, the boxes are a list of 
+        xarray.Dataset, see utils.domain.stitch_lon
+
+        """
+        hourly = []
+        files  = []
+        for hour in (hours or [None]):
+            era = []
+            for box in boxes(self.domain):
+                
+                #  create ERA5product instance
+                data = provider.era5(product, self.longname, domain = box)
+      
+                #  download data with matching time stamp
+                file = self.download(data, product, cache, box, hour)
+                files.append(file)
+                
+                ds, index = self.open(data, file)
+                
+                #  select the hour, files may contain several hours
+                select = hour if hour is not None else floor_hour(self.t_0)
+                i    = index.get(np.datetime64(select, 'h'))
+                if i is None:
+                    if ds['time'].size > 1:
+                        raise Exception("hour " + str(select) 
+                                        + " not found in " + file)
+                    i = 0
+                ds   = ds.isel(time = slice(i, i + 1))
+                
+                if chunks is not None:
+                    ds = ds.chunk(chunks)
+                
+                #  subset files covering a larger domain
+                era.append(self.crop(ds, box))
+                
+            hourly.append(stitch_lon(era))
+        
+        #   the files are read lazily, they are pinned as long as this 
+        #   instance exists
+        for file in files:
+            ERA5_cache.pin(file)
+        weakref.finalize(self, unpin_files, files)
+            
+        return hourly
+
+    def open(self, data, filename):
+        """
+        opens an ERA5 file lazily with latitudes in ascending order, 
+        files opened before are reused
 
+        Parameters
+        ----------
+        data : pansat ERA5Hourly instance, or object with the same interface
+        filename : string, path of ERA5 file
+
+        Returns
+        -------
+        ds : xarray.Dataset
+        index : dictionary with hours, np.datetime64 in hours, as keys and 
+                the time indices of the file as values
+
+        """
+        key = (os.path.abspath(filename), os.path.getmtime(filename))
+        if key in ERA5.opened:
+            ERA5.opened.move_to_end(key)
+            return ERA5.opened[key]
 
+        ds   = data.open(filename = filename)
         
-class ERA5p(ERA5):
-    """
-    class to download and load ERA5 surface variables
-    inherits from class ERA5
-    """
-    
-    def __init__(self, t_0, t_1, variables, domain = None):
+        #  flip latitude to be in ascending order, without reading data
+        lat  = ds['latitude'].data
+        if lat.size > 1 and lat[0] > lat[-1]:
+            ds = ds.isel(latitude = slice(None, None, -1))
+            
+        times = ds['time'].values.astype('datetime64[h]')
+        index = {time : i for i, time in enumerate(times)}
+            
+        #  open files are pinned, so that the cache does not remove them
+        ERA5.opened[key] = (ds, index)
+        ERA5_cache.pin(filename)
+        while len(ERA5.opened) > ERA5.max_open:
+            old, _ = ERA5.opened.popitem(last = False)
+            ERA5_cache.unpin(old[0])
         
-        super().__init__(t_0, t_1, variables, domain = None)
+        return ds, index
 
-        self.domain = domain
+    @staticmethod
+    def forget(filename):
+        """
+        drops a file from the opened files, e.g. when it is removed from 
+        the cache
+        """
+        filename = os.path.abspath(filename)
+        for key in [key for key in ERA5.opened if key[0] == filename]:
+            del ERA5.opened[key]
+            ERA5_cache.unpin(filename)
 
-        #       create ERA5product instance
-        print (self.longname)
-        data = ERA5Hourly('pressure', self.longname, domain = self.domain)
-  
-        #       download data with matching time stamp
-        file = data.download(self.t_0, self.t_1)
-        
-        #       load ERA5 data into an xarray           
-        self.era = data.open(filename = file[0])   
+    def bracket_hours(self):
+        """
+        full hours bracketing the scene, from the hour containing t_0 to the
+        first full hour at or after t_1
 
-        #       flip latitude to be in ascending order        
-        self.era = self.era.sortby('latitude' , ascending = True) 
-             
-        #   add extra pressure level in ERA5 data
-        xlevel = 1150 # hPa
-        self.add_extra_level(xlevel)
-        
+        Returns
+        -------
+        list of datetime objects
 
+        """
+        hours = [floor_hour(self.t_0)]
+        while hours[-1] < self.t_1:
+            hours.append(hours[-1] + timedelta(hours = 1))
         
-        
-    def add_extra_level(self,  xlevel):
-         """
-         adds extra pressure level at xlevel hPa to allow interpolation to 
-         levels lower than 1000 hPa for "pressure" ERA5 variables
-         Field values at xlevel hPa are equal to 1000 hPa
-         however,
-         Geopotential is converted using hydrostatic equation
-         
-         Parameters
+        return hours
+
+    def profile_times(self, other):
+        """
+        times of the profiles of other in seconds after the first hour in 
+        self.hours. Uses other.time, the time of each profile in seconds,
+        relative to other.t_0, the time of the first profile. Targets 
+        without time, e.g. locations, are at other.t_0 for all profiles
+
+        Parameters
         ----------
-        variable = geophysical parameter for which extra pressure layer 
-        is added 
-        xlevel = extra pressure level in hPa
-         Returns
-         -------
-         None.
-         
-         """     
-         # extract dataset at last pressure level
-         Ex             =  self.era[dict(level = [-1])]
-         
-         # geopotential at 1150 hPa is using simple conversion
-         if "geopotential" in self.longname:
-             Ex["z"]        = pres2alt(xlevel * 100) * g
-             
-         Ex["level"]    = np.array([xlevel])
-         self.era   = (xarray.concat([self.era, Ex], dim="level"))        
-         
-       
-    def expand_lon(self, lon, A):
+        other : Instance of DARDAR/locations class
+
+        Returns
+        -------
+        np.array
+
         """
-        Expands longitude of ERA5 by one point to mimic 
-        wrapping of data in interpolation
+        t_0   = (other.t_0 - self.hours[0]).total_seconds()
         
-        extra longitudnal point 180.25 and -180.25 are added, the corresponding value is copied
-        from longitude -180.0 and 180.0 deg respectively
+        if not hasattr(other, "time"):
+            return np.full(np.size(other.latitude), t_0)
         
+        time  = np.asarray(other.time, dtype = np.float64)
+        
+        return t_0 + time - time[0]
+
+    def download(self, data, product, cache = None, domain = None, 
+                 hour = None):
+        """
+        downloads the ERA5 file of the hour containing t_0, or of hour,
+        or takes it from the cache
+
         Parameters
         ----------
-        lon : np.array containing longitude values from -180 to 180
-        A : np.array containing the values at grid points defined by lon 
+        data : pansat ERA5Hourly instance, or object with the same interface
+               from a provider
+        product : string, "pressure" or "surface"
+        cache : ERA5cache instance, if None the file is downloaded with pansat
+        domain : None or [lat1, lat2, lon1, lon2] of data
+        hour : datetime object, full hour to be downloaded, 
+               if None the hour containing t_0
+
         Returns
         -------
-        lon : np.array with extended longitudes 
-        A : np.array with extra dimensions 
+        filename : string, path of ERA5 file
+
         """
+        t_0, t_1 = self.t_0, self.t_1
+        if hour is not None:
+            t_0, t_1 = hour, hour
+            
+        if cache is None:
+            file = data.download(t_0, t_1)
+            return file[0]
+        
+        return cache.fetch(data, product, t_0, t_1, self.longname, domain)
 
-        A_start = A[:, :, -1:]
-        A_end   = A[:, :, :1]
-        A = np.concatenate([A_start, A, A_end], axis = 2)
- 
-        lon = np.concatenate(([lon.min() - 0.25], lon))    
-        lon = np.concatenate((lon, [0.25 + lon.max()]))
+    def crop(self, era, domain):
+        """
+        subsets the loaded data to the domain, needed when the file covers a 
+        larger domain, e.g. a bulk file served from the cache.
+        Longitudes are only subset for files with longitudes in -180 to 180,
+        global files in 0 to 360 are kept as they are
+
+        Parameters
+        ----------
+        era : xarray.Dataset with latitudes in ascending order
+        domain : None or [lat1, lat2, lon1, lon2]
+
+        Returns
+        -------
+        xarray.Dataset
 
-        return lon, A     
-       
-    def interpolate(self, other, shortname, p_grid = None, method = "linear"):
         """
+        if domain is None:
+            return era
+        
+        lat1, lat2, lon1, lon2 = domain
+        
+        era = era.sel(latitude = slice(lat1, lat2))
         
+        lon = era['longitude'].data
+        if lon.min() >= -180.0 and lon.max() <= 180.0:
+            era = era.sel(longitude = slice(lon1, lon2))
+            
+        return era
+
+    def scene_plan(self, other, p_grid = None, dtype = None):
+        """
+        bracket indices and weights of DARDAR/locations track on the ERA5 
+        grids. The plan is built once per scene and can be passed to 
+        interpolate for all variables on the same grids
 
         Parameters
         ----------
         other : Instance of DARDAR/locations class
-        p_grid : if defined, pressure grid for interpolation (hPa) is used
-                 otherwise, DARDAR vertical locations are used.
- 
-        method : "nearest", "linear"; default is "linear"
+        p_grid : pressure grid for interpolation (hPa), only used for
+                 pressure level data, if None ERA5 levels are used
+        dtype : dtype of the interpolation, e.g. np.float32, default is
+                self.dtype. The fields are read in this dtype
+
         Returns
         -------
-        grid_t : np.array of gridded ERA5 data on DARDAR grid
+        ScenePlan instance
 
         """
         #   get DARDAR locations       
-        lon_d       = other.longitude
-        lat_d       = other.latitude
+        lon_d   = other.longitude
+        lat_d   = other.latitude
         
+        #   get ERA lat/lon grids    
+        lat     = self.era[0]['latitude'].data
+        lon     = stitched_lon(self.era)
+        
+        #   global grids, -180 to 180 or 0 to 359.75, wrap around in the 
+        #   plan without copying the fields
+        periodic = is_periodic(lon)
+            
+        #   convert to 0 to 360 for boxes crossing the antimeridian,
+        #   see utils.domain.stitch_lon
+        if not periodic and lon.max() > 180.5:
+            lon_d  = lon_d % 360.0
+
+        #   times of the ERA5 hours and the profiles for temporal 
+        #   interpolation
+        time    = None
+        time_d  = None
+        if self.hours is not None and len(self.hours) > 1:
+            time   = np.array([(hour - self.hours[0]).total_seconds() 
+                               for hour in self.hours])
+            time_d = self.profile_times(other)
+
+        if dtype is None:
+            dtype = self.dtype
 
+        return ScenePlan(lat, lon, lat_d, lon_d, level = self.level, 
+                         p_grid = p_grid, periodic = periodic,
+                         time = time, time_d = time_d, dtype = dtype)
 
+    def window(self, plan, shortnames):
+        """
+        reads the fields of shortnames in the lat/lon window of the plan,
+        other variables and grid points are not read
+
+        Parameters
+        ----------
+        plan : ScenePlan instance from scene_plan
+        shortnames : list of ERA5 shortnames
+
+        Returns
+        -------
+        fields : list of np.arrays in the window, dimensions [lat, lon] or 
+                 [level, lat, lon] of the first hour, with a leading
+                 dimension of the hours used if the plan has times,
+                 in the dtype of the plan if set
+        plan : ScenePlan instance on the window
+
+        """
+        time, lat, lon, plan = plan.window()
+        
+        hourly = [self.era] if time is None else self.hourly[time]
+        eras   = [read_window(era, shortnames, lat, lon, time = 0)
+                  for era in hourly]
         
-        level   = self.era['level'].data 
-        level   = np.log(level)  # convert pressure to log            
+        if time is None:
+            fields = eras[0]
+        else:
+            fields = [np.stack([era[i] for era in eras])
+                      for i in range(len(shortnames))]
             
-        #   get ERA lat/lon/pressure grids and corresponding field    
-        lat     = self.era['latitude'].data
-        lon     = self.era['longitude'].data     
-        field   = self.era[shortname].data[0] # 0 for time dimension 
-
-        #   add one extra dimension to longitude to wrap around during interpolation
-        if lon.min() == -180.0:
-            lon, field = self.expand_lon(lon, field)      
+        if plan.dtype is not None:
+            fields = [field.astype(plan.dtype, copy = False) 
+                      for field in fields]
         
-        #convert to 0 to 360, this is needed when global data is downloaded, domain = None
-        if lon.max() > 180.5:
-            lon_d  = lon_d % 360.0
+        return fields, plan
+
+    def interpolate_plan(self, plan, shortnames, method = "linear", 
+                         **kwargs):
+        """
+        reads the fields of shortnames in the window of each piece of the
+        track, see ScenePlan.pieces, and interpolates them with the plan
+
+        Parameters
+        ----------
+        plan : ScenePlan instance from scene_plan
+        shortnames : list of ERA5 shortnames
+        method : "nearest", "linear"; default is "linear"
+        kwargs : other arguments of ScenePlan.interpolate, e.g. extra
+
+        Returns
+        -------
+        np.array of gridded ERA5 data on DARDAR grid, the fields are stacked
+        along a trailing dimension
+
+        """
+        pieces = plan.pieces()
+        grid_t = []
+        for rows in pieces:
+            piece = plan if len(pieces) == 1 else plan.take(rows)
             
-        #interpolate ERA5 to DARDAR lat/lon locations 
- 
-        if p_grid is not None: # if a new p_grid is required           
-            p = np.log(p_grid) # convert pressure to log range
-
-        else:    # use ERA5 vertical grid
-            p = level
-
-        pts = []
-        for i in range(len(p)):
-            point = [[p[i], lat_d[j], lon_d[j]] for j in range(len(lat_d))] 
-            pts.append(point)       
-                 
-        my_interpolating_function = (interpolator((level, lat, lon),
-                                                  field, method = method))        
-        grid_t = my_interpolating_function(pts)
-        
-        return grid_t
-      
+            #   get ERA fields in the window of the piece
+            fields, piece = self.window(piece, shortnames)
+            if len(fields) == 1:
+                fields = fields[0][..., np.newaxis]
+            else:
+                fields = np.stack(fields, axis = -1)
+            
+            grid_t.append(piece.interpolate(fields, method, **kwargs))
+
+        if len(grid_t) == 1:
+            return grid_t[0]
         
-class ERA5s(ERA5):
+        #   track points are along the first dimension of surface fields 
+        #   and along the second of pressure level fields
+        return np.concatenate(grid_t, axis = 0 if plan.level is None else 1)
+
+    @property
+    def level(self):
+        """
+        pressure levels [hPa] used for interpolation, None for surface data
+        """
+        if 'level' in self.era[0].dims:
+            return self.era[0]['level'].data
+        return None
+
+
+
+#   files removed from the cache are dropped from the opened files
+ERA5_cache.evict_hooks.append(ERA5.forget)
+
+        
+class ERA5p(ERA5):
     """
     class to download and load ERA5 surface variables
     inherits from class ERA5
     """
     
-    def __init__(self, t_0, t_1, parameter, domain= None):
-        
-        super().__init__(t_0, t_1, parameter, domain = None)
+    def __init__(self, t_0, t_1, variables, domain = None, cache = None,
+                 provider = None, chunks = None, temporal = False, 
+                 dtype = None):
         
+        super().__init__(t_0, t_1, variables, domain = None)
+
+        self.dtype  = dtype
+
         self.domain = domain
+        
+        if provider is None:
+            provider = providers.get_default()
+
+        #       load ERA5 data into an xarray           
+        print (self.longname)
+        #   with temporal, the hours bracketing the scene are loaded and 
+        #   interpolated to the time of each profile
+        if temporal:
+            self.hours = self.bracket_hours()
+        self.hourly = self.load(provider, 'pressure', cache, chunks, 
+                                self.hours)
+        self.era    = self.hourly[0]
+             
+        #   extra pressure level in hPa, added virtually in interpolation
+        self.xlevel = 1150 
 
-        #  create ERA5product instance
-        data = ERA5Hourly('surface', self.longname, domain = self.domain)
-  
-        # download data with matching time stamp
-        file = data.download(self.t_0, self.t_1)
+    @property
+    def level(self):
+        """
+        ERA5 pressure levels [hPa] and the extra level xlevel
+        """
+        return np.append(self.era[0]['level'].data, self.xlevel)
+        
+    def extra_level(self, shortnames):
+        """
+        values at the extra pressure level xlevel hPa, which allows 
+        interpolation to levels lower than 1000 hPa. 
+        Field values at xlevel hPa are equal to 1000 hPa (NaN),
+        however,
+        Geopotential is converted using hydrostatic equation.
+        The ERA5 data is not changed, the level is added by the ScenePlan
+         
+        Parameters
+        ----------
+        shortnames : ERA5 shortname or list of shortnames of stacked fields
         
+        Returns
+        -------
+        np.array, value of each field at xlevel, NaN where the values of the
+        last ERA5 level are used
          
-        self.era = data.open(filename = file[0])        
+        """     
+        extra = np.full(np.shape(shortnames), np.nan)
+        
+        # geopotential at 1150 hPa is using simple conversion
+        extra[np.asarray(shortnames) == "z"] = pres2alt(self.xlevel * 100) * g
+        
+        return extra
+       
+    def interpolate(self, other, shortname, p_grid = None, method = "linear",
+                    plan = None, logspace = False):
+        """
+        
 
-        #  flip latitude to be in ascending order        
-        self.era = self.era.sortby('latitude' , ascending = True)   
+        Parameters
+        ----------
+        other : Instance of DARDAR/locations class
+        p_grid : if defined, pressure grid for interpolation (hPa) is used
+                 otherwise, DARDAR vertical locations are used.
+ 
+        method : "nearest", "linear"; default is "linear"
+        plan : ScenePlan instance from scene_plan, if given, other and p_grid
+               are not used and the brackets of the plan are reused
+        logspace : if True, log of the field is interpolated in log(p), 
+                   e.g. for humidity
+        Returns
+        -------
+        grid_t : np.array of gridded ERA5 data on DARDAR grid
 
-    
-       
-    def expand_lon(self, lon, A):
         """
-        Expands longitude of ERA5 by one point to mimic 
-        wrapping of data in interpolation
+        if plan is None:
+            plan = self.scene_plan(other, p_grid)
+            
+        #interpolate ERA5 to DARDAR lat/lon locations 
+        grid_t = self.interpolate_plan(plan, [shortname], method, 
+                                       extra = self.extra_level([shortname]),
+                                       logspace = logspace)
         
-        extra longitudnal point 360.0 is added, the corresponding value is copied
-        from longitude 0 deg.
+        return grid_t[..., 0]
+      
         
+    def interpolate_many(self, other, shortnames, p_grid = None, 
+                         method = "linear", plan = None, logspace = False):
+        """
+        interpolates several variables in one pass. The fields are stacked
+        along a trailing dimension and share one gather of the neighbours
+
         Parameters
         ----------
-        lon : np.array containing longitude values from 0 - 359.75
-        A : np.array containing the values at grid points defined by lon 
+        other : Instance of DARDAR/locations class
+        shortnames : list of ERA5 shortnames, e.g. ["t", "z", "q"]
+        p_grid : if defined, pressure grid for interpolation (hPa) is used
+                 otherwise, ERA5 levels are used
+        method : "nearest", "linear"; default is "linear"
+        plan : ScenePlan instance from scene_plan, if given, other and p_grid
+               are not used
+        logspace : if True, log of the fields are interpolated in log(p)
+
         Returns
         -------
-        lon : np.array with extended longitudes 
-        A : np.array with extra dimensions 
+        dictionary with shortnames as keys and np.arrays of gridded ERA5 
+        data on DARDAR grid as values
+
         """
+        if plan is None:
+            plan = self.scene_plan(other, p_grid)
+            
+        #   fields stacked along last dimension
+        grid_t  = self.interpolate_plan(plan, shortnames, method, 
+                                        extra = self.extra_level(shortnames),
+                                        logspace = logspace)
         
-        A_start = A[ :, -1:]
-        A_end   = A[ :,  :1]
-        A = np.concatenate([A_start, A, A_end], axis = 1)
- 
-        lon = np.concatenate(([lon.min() - 0.25], lon))    
-        lon = np.concatenate((lon, [0.25 + lon.max()]))
+        return {shortname : grid_t[..., i] 
+                for i, shortname in enumerate(shortnames)}
+      
+        
+class ERA5s(ERA5):
+    """
+    class to download and load ERA5 surface variables
+    inherits from class ERA5
+    """
     
-        return lon, A             
+    def __init__(self, t_0, t_1, parameter, domain= None, cache = None,
+                 provider = None, chunks = None, temporal = False, 
+                 dtype = None):
+        
+        super().__init__(t_0, t_1, parameter, domain = None)
+
+        self.dtype  = dtype
+        
+        self.domain = domain
+        
+        if provider is None:
+            provider = providers.get_default()
+
+        #  load ERA5 data into an xarray           
+        #   with temporal, the hours bracketing the scene are loaded and 
+        #   interpolated to the time of each profile
+        if temporal:
+            self.hours = self.bracket_hours()
+        self.hourly = self.load(provider, 'surface', cache, chunks, 
+                                self.hours)
+        self.era    = self.hourly[0]
+
+    
+       
          
         
-    def interpolate(self,  other, shortname, method = "linear"):
+    def interpolate(self,  other, shortname, method = "linear", plan = None):
         """
         
 
         Parameters
         ----------
         other : Instance of DARDAR/locations class
+        method : "linear", "nearest", default is "linear"
+        plan : ScenePlan instance from scene_plan, if given, other is not used
+               and the brackets of the plan are reused
 
         Returns
         -------
         grid_t : np.array of gridded surface ERA5 data on DARDAR grid
-        method : "linear", "nearest", default is "linear"
         
         """
-        lon_d = other.longitude
-        lat_d = other.latitude
-        
-        
-
+        if plan is None:
+            plan = self.scene_plan(other)
             
-            
-        #   get ERA lat/lon/pressure grids    
-        lat     = self.era['latitude'].data
-        lon     = self.era['longitude'].data
-        
-        field   = self.era[shortname].data[0] # 0 for time dimension 
+        grid_t = self.interpolate_plan(plan, [shortname], method)
         
+        return grid_t[..., 0]
 
-        #   add one extra dimension to longitude to wrap around during interpolation  
-        if lon.min() == -180.0:
+    def interpolate_many(self, other, shortnames, method = "linear", 
+                         plan = None):
+        """
+        interpolates several variables in one pass. The fields are stacked
+        along a trailing dimension and share one gather of the neighbours
 
-            lon, field = self.expand_lon(lon, field)        
+        Parameters
+        ----------
+        other : Instance of DARDAR/locations class
+        shortnames : list of ERA5 shortnames, e.g. ["lsm", "siconc"]
+        method : "linear", "nearest", default is "linear"
+        plan : ScenePlan instance from scene_plan, if given, other is not used
 
-        #   convert longitude from -180 -- 180 to 0--360, if required
-        #   in some cases ERA5 longitudes could be 0 to 360 format            
-        if lon.max() > 180.5:
-            lon_d  = lon_d % 360.0
+        Returns
+        -------
+        dictionary with shortnames as keys and np.arrays of gridded surface
+        ERA5 data on DARDAR grid as values
+
+        """
+        if plan is None:
+            plan = self.scene_plan(other)
             
-        pts = [[lat_d[j], lon_d[j]] for j in range(len(lat_d))]       
-        
-        my_interpolating_function = (interpolator((lat, lon), field, 
-                                                  method= method))        
-        grid_t = my_interpolating_function(pts)
+        #   fields stacked along last dimension
+        grid_t  = self.interpolate_plan(plan, shortnames, method)
         
-        return grid_t
-        
-        
-     
-
+        return {shortname : grid_t[..., i] 
+                for i, shortname in enumerate(shortnames)}
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+Persistent local cache of downloaded ERA5 files.
+
+Each file holds one or more hours, e.g. a day, of one ERA5 product 
+("pressure" or "surface") for a set of variables and a domain. Files are 
+stored as <key>.nc in the cache directory, the key is a hash of (product, 
+first hour, variables, domain). An index file (index.json) keeps the hours 
+contained in each file, read from its time coordinate, so that every hour 
+of a multi-hour file is served from the one stored copy. The index also
+keeps the size and last access time of each file, and the
+least recently used files are removed when the cache exceeds max_size.
+Files in use, e.g. opened lazily by ERA5, are pinned and not removed.
+Access times are updated in memory and written with the index when files
+are added.
+The cache can be shared by several threads, e.g. with ERA5_prefetch.
+A request is also served from a file with more variables or a larger domain,
+e.g. from the bulk files of ERA5_planner.
+
+Example
+-------
+cache = ERA5cache("ERA5_cache", max_size = 50e9)
+erap  = ERA5p(t_0, t_1, variables_p, domain, cache = cache)
+
+@author: inderpreet
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy as np
+import xarray
+from datetime import datetime, timedelta
+
+
+def floor_hour(t):
+    """
+    datetime t rounded down to full hour
+    """
+    return t.replace(minute = 0, second = 0, microsecond = 0)
+
+
+def contains(outer, inner):
+    """
+    True if the domain outer contains the domain inner,
+    domains are [lat1, lat2, lon1, lon2] or None for global data
+    """
+    if outer is None:
+        return True
+    if inner is None:
+        return False
+    return (outer[0] <= inner[0] and outer[1] >= inner[1]
+            and outer[2] <= inner[2] and outer[3] >= inner[3])
+
+
+# reference counts of files in use, shared by all caches
+_pins      = {}
+_pins_lock = threading.Lock()
+
+# functions called with the path of each removed file, e.g. to close it
+evict_hooks = []
+
+
+def pin(filename):
+    """
+    marks a file as in use, pinned files are not evicted
+    """
+    filename = os.path.abspath(filename)
+    with _pins_lock:
+        _pins[filename] = _pins.get(filename, 0) + 1
+
+
+def unpin(filename):
+    """
+    releases a file pinned with pin
+    """
+    filename = os.path.abspath(filename)
+    with _pins_lock:
+        count = _pins.get(filename, 0) - 1
+        if count > 0:
+            _pins[filename] = count
+        else:
+            _pins.pop(filename, None)
+
+
+def pinned(filename):
+    """
+    True if the file is in use
+    """
+    with _pins_lock:
+        return os.path.abspath(filename) in _pins
+
+
+def file_hours(filename, hour):
+    """
+    hours contained in an ERA5 file, from its time coordinate
+
+    Parameters
+    ----------
+    filename : path of the ERA5 file
+    hour : datetime object, hour used if the file has no time coordinate
+
+    Returns
+    -------
+    list of strings, hours as "%Y%m%d%H"
+
+    """
+    try:
+        with xarray.open_dataset(filename) as ds:
+            times = np.atleast_1d(ds['time'].values)
+    except (OSError, ValueError, KeyError):
+        return [floor_hour(hour).strftime("%Y%m%d%H")]
+    
+    return [t.astype("datetime64[h]").astype(object).strftime("%Y%m%d%H")
+            for t in times]
+
+
+class ERA5cache():
+    """
+    content addressed cache of ERA5 files with least recently used eviction
+    """
+
+    def __init__(self, path = "ERA5_cache", max_size = None):
+        """
+        Parameters
+        ----------
+        path : directory of the cache, created if it does not exist
+        max_size : maximum size of the cached files in bytes,
+                   None for no limit
+
+        Returns
+        -------
+        None.
+
+        """
+        self.path     = path
+        self.max_size = max_size
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        self.index_file = os.path.join(self.path, "index.json")
+        self.index      = self.load_index()
+        
+        # downloads in progress, other threads wait for them
+        self.lock       = threading.RLock()
+        self.pending    = {}
+
+    def load_index(self):
+        """
+        reads the index, entries of missing files are dropped
+        """
+        if not os.path.isfile(self.index_file):
+            return {}
+
+        with open(self.index_file, "r") as f:
+            index = json.load(f)
+
+        # entries of single hour files written before hours were indexed
+        for entry in index.values():
+            if "hours" not in entry:
+                entry["hours"] = [entry.pop("hour")]
+
+        return {key : entry for key, entry in index.items()
+                if os.path.isfile(os.path.join(self.path, entry["file"]))}
+
+    def save_index(self):
+        """
+        writes the index, the old index is replaced only after writing
+        """
+        tmp = self.index_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent = 1)
+        os.replace(tmp, self.index_file)
+
+    @staticmethod
+    def key(product, hour, variables, domain = None):
+        """
+        key of one cached file
+
+        Parameters
+        ----------
+        product : string, "pressure" or "surface"
+        hour : datetime object, rounded down to full hour
+        variables : list of ERA5 longnames
+        domain : None or [lat1, lat2, lon1, lon2]
+
+        Returns
+        -------
+        string, sha1 hash of the inputs
+
+        """
+        if domain is not None:
+            domain = [float(d) for d in domain]
+
+        content = json.dumps([product,
+                              floor_hour(hour).strftime("%Y%m%d%H"),
+                              sorted(variables),
+                              domain])
+
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    @property
+    def size(self):
+        """
+        total size of the cached files in bytes
+        """
+        with self.lock:
+            return sum(entry["size"] for entry in self.index.values())
+
+    def get(self, product, hour, variables, domain = None):
+        """
+        path of the cached file, None if the file is not cached
+
+        Parameters
+        ----------
+        see key
+
+        Returns
+        -------
+        string or None
+
+        """
+        with self.lock:
+            key = self.key(product, hour, variables, domain)
+            if key not in self.index:
+                key = self.find(product, hour, variables, domain)
+            if key is None:
+                return None
+    
+            filename = os.path.join(self.path, self.index[key]["file"])
+            if not os.path.isfile(filename):
+                del self.index[key]
+                self.save_index()
+                return None
+    
+            # written to the index file with the next put
+            self.index[key]["last_access"] = time.time()
+
+        return filename
+
+    def find(self, product, hour, variables, domain = None):
+        """
+        key of a cached file of the same product containing the hour, all 
+        variables and the domain, the smallest such file is used
+
+        Parameters
+        ----------
+        see key
+
+        Returns
+        -------
+        string or None
+
+        """
+        hour    = floor_hour(hour).strftime("%Y%m%d%H")
+        if domain is not None:
+            domain = [float(d) for d in domain]
+        
+        found   = [(entry["size"], key) for key, entry in self.index.items()
+                   if entry["product"] == product and hour in entry["hours"]
+                   and set(variables) <= set(entry["variables"])
+                   and contains(entry["domain"], domain)]
+
+        if not found:
+            return None
+        
+        return min(found)[1]
+
+    def put(self, product, hour, variables, domain, filename):
+        """
+        moves a downloaded file into the cache, all hours of the file are
+        added to the index
+
+        Parameters
+        ----------
+        product, variables, domain : see key
+        hour : datetime object, hour of the file if it has no time 
+               coordinate
+        filename : path of the downloaded file
+
+        Returns
+        -------
+        string, path of the file in the cache
+
+        """
+        source   = os.path.abspath(filename)
+
+        with self.lock:
+            # the same provider file may be downloaded by two overlapping 
+            # requests, the second finds it already moved into the cache
+            if not os.path.isfile(filename):
+                for key, entry in self.index.items():
+                    if entry.get("source") == source:
+                        entry["last_access"] = time.time()
+                        return os.path.join(self.path, entry["file"])
+                raise Exception("ERA5 file " + filename + " not found")
+            
+            # the file is stored under the key of its first hour
+            hours  = file_hours(filename, hour)
+            key    = self.key(product, datetime.strptime(hours[0], "%Y%m%d%H"),
+                              variables, domain)
+            name   = key + ".nc"
+            target = os.path.join(self.path, name)
+            
+            if source != os.path.abspath(target):
+                shutil.move(filename, target)
+    
+            self.index[key] = {"file"        : name,
+                               "source"      : source,
+                               "size"        : os.path.getsize(target),
+                               "last_access" : time.time(),
+                               "product"     : product,
+                               "hours"       : hours,
+                               "variables"   : sorted(variables),
+                               "domain"      : (None if domain is None
+                                                else [float(d) for d in domain])}
+    
+            self.evict(keep = key)
+            self.save_index()
+
+        return target
+
+    def evict(self, keep = None):
+        """
+        removes least recently used files until the cache fits in max_size,
+        pinned files are kept
+
+        Parameters
+        ----------
+        keep : key which is not removed, e.g. the file just added
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.max_size is None:
+            return
+
+        with self.lock:
+            entries = sorted(self.index.items(),
+                             key = lambda item: item[1]["last_access"])
+            size    = self.size
+    
+            for key, entry in entries:
+                if size <= self.max_size:
+                    break
+                if key == keep:
+                    continue
+                filename = os.path.join(self.path, entry["file"])
+                if pinned(filename):
+                    continue
+                for hook in evict_hooks:
+                    hook(filename)
+                if os.path.isfile(filename):
+                    os.remove(filename)
+                size -= entry["size"]
+                del self.index[key]
+
+    def fetch(self, data, product, t_0, t_1, variables, domain = None):
+        """
+        file containing the hour of t_0, from the cache if available,
+        otherwise downloaded with the pansat product data. All files
+        downloaded between t_0 and t_1 are added to the cache, with all
+        the hours they contain
+
+        Parameters
+        ----------
+        data : pansat ERA5Hourly instance
+        product : string, "pressure" or "surface"
+        t_0 : datetime.datetime object, start time
+        t_1 : datetime.datetime object, end time
+        variables : list of ERA5 longnames
+        domain : None or [lat1, lat2, lon1, lon2]
+
+        Returns
+        -------
+        string, path of the file in the cache
+
+        """
+        # all hours the download may add to the cache
+        keys = []
+        hour = floor_hour(t_0)
+        while hour <= t_1:
+            keys.append(self.key(product, hour, variables, domain))
+            hour += timedelta(hours = 1)
+        
+        with self.lock:
+            filename = self.get(product, t_0, variables, domain)
+            if filename is not None:
+                return filename
+            
+            # the same files are downloaded by another thread
+            event = next((self.pending[key] for key in keys 
+                          if key in self.pending), None)
+            if event is None:
+                done = threading.Event()
+                for key in keys:
+                    self.pending[key] = done
+        
+        if event is not None:
+            event.wait()
+            return self.fetch(data, product, t_0, t_1, variables, domain)
+
+        try:
+            # download returns the files from the hour of t_0, one per hour
+            # or per day, the file of t_0 is added last, so that it is not 
+            # evicted
+            files = data.download(t_0, t_1)
+            if len(files) == 0:
+                raise Exception("no ERA5 file downloaded for " + str(t_0))
+            hour  = floor_hour(t_0)
+            for i in reversed(range(len(files))):
+                self.put(product, hour + timedelta(hours = i), variables, 
+                         domain, files[i])
+            
+            filename = self.get(product, t_0, variables, domain)
+            if filename is None:
+                raise Exception("hour " + str(hour) 
+                                + " not found in the downloaded ERA5 files")
+        finally:
+            with self.lock:
+                for key in keys:
+                    self.pending.pop(key)
+                done.set()
+
+        return filename
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+Plans the ERA5 downloads of a batch of DARDAR granules.
+
+Instead of one pressure and one surface request for each scene, the ERA5
+hours needed by all scenes are collected, merged into runs of consecutive
+hours within each day and downloaded once per run for a common domain,
+e.g. a latitude band. The files are added to an ERA5cache, from which
+ERA5p and ERA5s later load the scenes, subset to their own domain.
+
+Example
+-------
+cache    = ERA5cache("ERA5_cache")
+hours    = scene_hours(dardarfiles, latlims, Nodes)
+requests = plan_requests(hours, domain = band_domain(latlims))
+submit(requests, variables_p, variables_s, cache)
+
+@author: inderpreet
+"""
+
+from datetime import timedelta
+from era2dardar import providers
+from era2dardar.RADARLIDAR import DARDAR
+from era2dardar.ERA5_cache import floor_hour
+
+
+def band_domain(latlims, pad = 2):
+    """
+    domain of a latitude band containing all scenes within latlims
+
+    Parameters
+    ----------
+    latlims : [lat1, lat2], latitude limits of the scenes
+    pad : float, extra degrees at both ends, as added to the scene domains
+
+    Returns
+    -------
+    domain : [lat1, lat2, lon1, lon2]
+
+    """
+    lat1, lat2 = latlims
+    return [float(max(lat1 - pad, -90.0)), float(min(lat2 + pad, 90.0)), -180.0, 180.0]
+
+
+def scene_end(scene):
+    """
+    time of the last profile of a scene, t_1 if it is later
+    """
+    time = scene.time
+    return max(scene.t_1, 
+               scene.t_0 + timedelta(seconds = float(time[-1] - time[0])))
+
+
+def scene_hours(dardarfiles, latlims, nodes = ("A", "D_N", "D_S"),
+                reader = DARDAR, temporal = False):
+    """
+    ERA5 hours needed for the scenes of the granules, all hours from the 
+    hour containing t_0 to the hour containing t_1 of each scene
+
+    Parameters
+    ----------
+    dardarfiles : list of DARDAR files
+    latlims : [lat1, lat2], latitude limits of the scenes
+    nodes : list of nodes, "A", "D_N", "D_S"
+    reader : class used to read the granules, default RADARLIDAR.DARDAR
+    temporal : if True, ERA5 is interpolated in time, the scenes end at 
+               their last profile, see scene_end, and the next hour after 
+               the end is added
+
+    Returns
+    -------
+    sorted list of datetime objects
+
+    """
+    hours = set()
+    for dardarfile in dardarfiles:
+        scenes = reader.split_nodes(dardarfile, latlims, nodes)
+        for scene in scenes.values():
+            end  = scene_end(scene) if temporal else scene.t_1
+            last = floor_hour(end)
+            if temporal:
+                last += timedelta(hours = 1)
+            
+            hour = floor_hour(scene.t_0)
+            while hour <= last:
+                hours.add(hour)
+                hour += timedelta(hours = 1)
+
+    return sorted(hours)
+
+
+def plan_requests(hours, domain = None, max_hours = 24):
+    """
+    merges hours into requests of consecutive hours within the same day
+
+    Parameters
+    ----------
+    hours : list of datetime objects, full hours
+    domain : [lat1, lat2, lon1, lon2] of all requests, None for global data
+    max_hours : int, maximum number of hours in one request
+
+    Returns
+    -------
+    list of (start, end, domain), start and end are the first and last hour
+
+    """
+    requests = []
+    hours    = sorted(set(floor_hour(h) for h in hours))
+
+    for hour in hours:
+        if requests:
+            start, end, _ = requests[-1]
+            if (hour - end == timedelta(hours = 1)
+                and hour.date() == start.date()
+                and (hour - start) < timedelta(hours = max_hours)):
+                requests[-1] = (start, hour, domain)
+                continue
+        requests.append((hour, hour, domain))
+
+    return requests
+
+
+def submit(requests, variables_p, variables_s, cache, product = None):
+    """
+    downloads the planned requests for pressure level and surface variables
+    and adds the files to the cache
+
+    Parameters
+    ----------
+    requests : list of (start, end, domain), see plan_requests
+    variables_p : list of ERA5 longnames of pressure level variables
+    variables_s : list of ERA5 longnames of surface variables
+    cache : ERA5cache instance
+    product : function (levels, variables, domain) returning an object 
+              with the interface of pansat ERA5Hourly, used to download 
+              the data, default is era5 of the default provider
+
+    Returns
+    -------
+    None.
+
+    """
+    if product is None:
+        product = providers.get_default().era5
+        
+    for start, end, domain in requests:
+        for levels, variables in [("pressure", variables_p),
+                                  ("surface", variables_s)]:
+            if not variables:
+                continue
+
+            # hours already in the cache are not downloaded again
+            hour    = start
+            missing = False
+            while hour <= end:
+                if cache.get(levels, hour, variables, domain) is None:
+                    missing = True
+                    break
+                hour += timedelta(hours = 1)
+            if not missing:
+                continue
+
+            # the cache indexes all hours of each file, e.g. of daily files
+            data  = product(levels, variables, domain = domain)
+            files = data.download(start, end)
+            for i, file in enumerate(files):
+                cache.put(levels, start + timedelta(hours = i),
+                          variables, domain, file)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+Background download of ERA5 files for the next scenes of a batch run.
+
+While a scene is processed, the ERA5 pressure level and surface files of the
+next granules are downloaded into an ERA5cache by a pool of threads. At most
+lookahead granules are queued ahead of the current one, and no new downloads
+are started when the cache is larger than max_size.
+
+Example
+-------
+prefetch = ERA5prefetch(cache, variables_p, variables_s, lookahead = 2)
+for dardarfile in prefetch.run(dardarfiles, scenes):
+    ...
+    erap = ERA5p(t_0, t_1, variables_p, domain, cache = cache)
+
+@author: inderpreet
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from era2dardar import providers
+from era2dardar.utils.domain import boxes
+
+
+class ERA5prefetch():
+    """
+    thread pool downloading ERA5 files into an ERA5cache ahead of their use
+    """
+
+    def __init__(self, cache, variables_p, variables_s, lookahead = 2,
+                 workers = 2, max_size = None, product = None):
+        """
+        Parameters
+        ----------
+        cache : ERA5cache instance, shared with ERA5p and ERA5s
+        variables_p : list of ERA5 longnames of pressure level variables
+        variables_s : list of ERA5 longnames of surface variables
+        lookahead : int, number of items downloaded ahead of the current one
+        workers : int, number of download threads
+        max_size : maximum size of the cache in bytes up to which files are
+                   prefetched, None for no limit. Should be smaller than
+                   the max_size of the cache, so that prefetched files are
+                   not evicted before they are used
+        product : function (levels, variables, domain) returning an object 
+                  with the interface of pansat ERA5Hourly, default is era5 
+                  of the default provider
+
+        Returns
+        -------
+        None.
+
+        """
+        self.cache       = cache
+        self.variables_p = variables_p
+        self.variables_s = variables_s
+        self.lookahead   = lookahead
+        self.max_size    = max_size
+        self.product     = product
+        if product is None:
+            self.product = providers.get_default().era5
+        self.executor    = ThreadPoolExecutor(max_workers = workers)
+        self.futures     = []
+
+    def fetch(self, t_0, t_1, domain):
+        """
+        downloads pressure level and surface files of one scene into the cache
+
+        Parameters
+        ----------
+        t_0 : datetime.datetime object, start time
+        t_1 : datetime.datetime object, end time
+        domain : None, [lat1, lat2, lon1, lon2] or list of boxes,
+                 see utils.domain.scene_domain
+
+        Returns
+        -------
+        None.
+
+        """
+        for levels, variables in [("pressure", self.variables_p),
+                                  ("surface", self.variables_s)]:
+            for box in boxes(domain):
+                if (self.max_size is not None 
+                    and self.cache.size >= self.max_size):
+                    return
+                data = self.product(levels, variables, domain = box)
+                self.cache.fetch(data, levels, t_0, t_1, variables, box)
+
+    def submit(self, scenes):
+        """
+        queues the downloads of scenes
+
+        Parameters
+        ----------
+        scenes : list of (t_0, t_1, domain)
+
+        Returns
+        -------
+        list of futures
+
+        """
+        futures = [self.executor.submit(self.fetch, t_0, t_1, domain)
+                   for t_0, t_1, domain in scenes]
+        self.futures.extend(futures)
+        return futures
+
+    def run(self, items, scenes):
+        """
+        iterates over items, e.g. DARDAR granules, and downloads the ERA5
+        files of the next lookahead items in the background
+
+        Parameters
+        ----------
+        items : list of items processed in this order
+        scenes : function of one item returning the list of (t_0, t_1, domain)
+                 of its scenes, called in the calling thread
+
+        Yields
+        ------
+        items
+
+        """
+        items     = list(items)
+        submitted = 0
+
+        for i, item in enumerate(items):
+
+            # keep at most lookahead items queued after the current one
+            while submitted < min(len(items), i + 1 + self.lookahead):
+                try:
+                    self.submit(scenes(items[submitted]))
+                except Exception as e:
+                    print ("prefetch failed for ", items[submitted], e)
+                submitted += 1
+
+            yield item
+
+            self.check()
+
+        self.close()
+
+    def check(self):
+        """
+        removes finished downloads from the queue, failed downloads are
+        reported and done again when the scene is loaded
+        """
+        running = []
+        for future in self.futures:
+            if not future.done():
+                running.append(future)
+            elif future.exception() is not None:
+                print ("prefetch failed: ", future.exception())
+        self.futures = running
+
+    def close(self):
+        """
+        waits for the queued downloads and stops the threads
+        """
+        self.executor.shutdown(wait = True)
+        self.check()
@@ -9,13 +9,17 @@ Created on Thu Nov 26 12:33:27 2020
 
 from pyhdf.SD import SD, SDC
 import os
+import copy
 from datetime import datetime, timedelta
 import numpy as np
 from mpl_toolkits.basemap import Basemap
 import matplotlib.pyplot as plt
 from era2dardar.utils.seconds2datetime import seconds2datetime
 from era2dardar.utils.Z2dbZ import Z2dbZ, dbZ2Z
-from pansat.products.satellite.cloud_sat import l2b_geoprof
+from era2dardar import providers
+from era2dardar.utils.data_cache import data_cache
+from era2dardar.utils.read_rows import index2runs
+from era2dardar.utils.read_rows import read_rows
 
 
 class radarlidar():
@@ -27,7 +31,10 @@ class radarlidar():
     
     """    
     
-    def __init__(self, filename, latlims = None, node = "A"):
+    # variables common to all profiles, not subset by node
+    common = ()
+    
+    def __init__(self, filename, latlims = None, node = "A", cache_size = None):
         """
         Opens the dardar hdf4 dataset
 
@@ -41,6 +48,9 @@ class radarlidar():
         node : string "A" or "D_N" or "D_S", the ascending node or descending node(NH or SH)
                The default node selected is ascending one
                If Latlims is None, the complete scene is used.
+        cache_size : int, maximum size in bytes of the variables kept in 
+               memory after the first read, None for no limit, 
+               0 to read from file at every call
                
         Exceptions:
             
@@ -53,6 +63,17 @@ class radarlidar():
              
         self.latlims = latlims
         
+        # profiles of the selected node within latlims, set by the subclasses
+        self.index = None
+        
+        # variables already read and subset
+        self.cache = data_cache(cache_size)
+        
+        # for node subsets from split_nodes, the instance holding the rows 
+        # of all nodes and the position of this node in its rows
+        self.store = None
+        self.rows  = None
+        
         #if self.latitude.size == 0:
         #    raise Exception("No data returned, input another latlims")
             
@@ -118,10 +139,11 @@ class radarlidar():
         
 
         
-    def get_node(self, lat, data):
+    def get_data(self, variable):
         """
-        get the data for the selected variable for the input node ascending/descening
-
+        get the data for the selected variable, subset to the selected node.
+        Each variable is read from file once, later calls return the 
+        cached array, which is read-only
 
         Parameters
         ----------
@@ -131,12 +153,112 @@ class radarlidar():
         -------
         ndarray containing the input variable
 
+        """
+        data = self.cache.get(variable)
+        if data is None:
+            if self.store is not None:
+                data = self.store.get_data(variable)
+                if variable not in self.common:
+                    data = data[self.rows]
+            else:
+                data = self.read(variable)
+            data = self.cache.put(variable, data)
+        return data
+
+    @property
+    def ranges(self):
+        """
+        contiguous ranges of orbit profiles in the selected node
+
+        Returns
+        -------
+        starts : np.array, first profile of each range
+        counts : np.array, number of profiles in each range
+
+        """
+        if self.index is None:
+            return index2runs(np.arange(self.latitude.size))
+        return index2runs(self.index)
+
+    @classmethod
+    def split_nodes(cls, filename, latlims, nodes = ("A", "D_N", "D_S"),
+                    cache_size = None, **kwargs):
+        """
+        opens the granule once and returns the subsets for several nodes.
+        The nodes are found from one read of latitude, and each variable 
+        is read once for all nodes, the node subsets are views of the 
+        shared arrays where possible
+
+        Parameters
+        ----------
+        filename  (str): input DARDAR/Cloudsat file
+        latlims : [lat1, lat2], list containing lower and upper limits of
+                  latitude values
+        nodes : list of nodes, "A", "D_N", "D_S"
+        cache_size : int, maximum size in bytes of the cached variables,
+                     for each node and for the shared arrays
+        kwargs : other arguments of cls, e.g. provider for CLOUDSAT
+
+        Returns
+        -------
+        dictionary with nodes as keys and instances of cls as values.
+        Nodes without profiles within latlims are not included
+
+        """
+        orbit         = cls(filename, cache_size = cache_size, **kwargs)
+        orbit.latlims = latlims
+        orbit.node    = None
+        
+        lat           = orbit.latitude
+        index         = {node : orbit.node_index(lat, node) for node in nodes}
+        
+        # rows of all nodes are read together
+        orbit.index   = np.unique(np.concatenate(list(index.values())))
+        orbit.cache.clear()
+        orbit.cache.put("latitude", lat[orbit.index])
+        
+        scenes = {}
+        for node in nodes:
+            if index[node].size == 0:
+                continue
+            
+            rows  = np.searchsorted(orbit.index, index[node])
+            
+            # contiguous rows are sliced, no copy is made
+            if rows[-1] - rows[0] + 1 == rows.size:
+                rows = slice(rows[0], rows[-1] + 1)
+            
+            scene       = copy.copy(orbit)
+            scene.node  = node
+            scene.index = index[node]
+            scene.cache = data_cache(cache_size)
+            scene.store = orbit
+            scene.rows  = rows
+            scenes[node] = scene
+            
+        return scenes
+
+    def node_index(self, lat, node = None):
+        """
+        indices of the profiles in the selected node and latitude limits
+
+
+        Parameters
+        ----------
+        lat : np.array containing latitudes of the complete orbit
+        node : "A", "D_N", "D_S", if None the node of the instance is used
+
+        Returns
+        -------
+        np.array containing the indices of the selected profiles
+
         """
          
+        if node is None:
+            node = self.node
+            
         lat1, lat2 = self.latlims
 
-        lat_sub = lat
-
         # to avoid extracting two latitudes, each from ascending and descending node  
         # find the part of orbit with increasing latitudes            
         
@@ -150,29 +272,49 @@ class radarlidar():
             raise Exception("No increasing latitudes were found")
             
         
-        if self.node == "A": 
+        if node == "A": 
 
-            lat_sub = lat[mask1] 
+            rows = np.flatnonzero(mask1)
+            lat_sub = lat[rows] 
             inds = (lat_sub >= lat1) & (lat_sub <= lat2)                      
-            data = data[mask1][inds]
 
-        if self.node == "D_N":
+        elif node == "D_N":
 
-            lat_sub = lat[~mask1] 
-            inds = (lat_sub >= 0) & (lat_sub <= lat2)  
-            if np.sum(~mask1) == 0:
+            rows = np.flatnonzero(~mask1)
+            if rows.size == 0:
                 raise Exception("No data in the NH descending pass")
-            data  = data[~mask1][inds]      
+            lat_sub = lat[rows] 
+            inds = (lat_sub >= 0) & (lat_sub <= lat2)  
 
-        if self.node == "D_S":
+        elif node == "D_S":
 
-            lat_sub = lat[~mask1] 
-            inds = (lat_sub >= lat1) & (lat_sub < 0)  
-            if np.sum(~mask1) == 0:
+            rows = np.flatnonzero(~mask1)
+            if rows.size == 0:
                 raise Exception("No data in the SH descending pass")
-            data  = data[~mask1][inds]   
+            lat_sub = lat[rows] 
+            inds = (lat_sub >= lat1) & (lat_sub < 0)  
+            
+        else:
+            raise Exception("node should be one of 'A', 'D_N' or 'D_S'")
                     
-        return data            
+        return rows[inds]            
+        
+    def get_node(self, lat, data):
+        """
+        get the data for the selected variable for the input node ascending/descening
+
+
+        Parameters
+        ----------
+        lat : np.array containing latitudes of the complete orbit
+        data : Input variable for the complete orbit
+
+        Returns
+        -------
+        ndarray containing the input variable
+
+        """
+        return data[self.node_index(lat)]
  
     
     def plot_scene(self):
@@ -200,9 +342,12 @@ class radarlidar():
 
 class DARDAR(radarlidar):
     
-    def __init__(self, filename, latlims = None, node = "A"):
+    # height is common to all profiles   
+    common = ("height",)
+    
+    def __init__(self, filename, latlims = None, node = "A", cache_size = None):
         
-        super().__init__(filename, latlims, node)
+        super().__init__(filename, latlims, node, cache_size)
         
         self.file = SD(self.filename, SDC.READ)
         
@@ -211,13 +356,18 @@ class DARDAR(radarlidar):
         # list of SDS variables
         self.SDS = datasets_dic.keys()
     
+        # node is searched once for all variables
+        if self.latlims is not None:
+            lat        = self.file.select('latitude').get()
+            self.index = self.node_index(lat)
+            self.cache.put("latitude", lat[self.index])
         
         if self.latitude.size == 0:
             raise Exception("No data returned, input another latlims")        
         
-    def get_data(self, variable):
+    def read(self, variable):
         """
-        get the data for the selected variable
+        read the data for the selected variable from file
         complete list of SDS variables is also contained in self.SDS
 
         Parameters
@@ -234,16 +384,12 @@ class DARDAR(radarlidar):
             
         sds_obj = self.file.select(variable) # select sds
 
-        data = sds_obj.get() # get sds data    
+        # only the rows of the selected node are read
+        index = self.index
+        if variable in self.common:
+            index = None
             
-        if self.latlims is not None:
-            # subsetting  data   
-            if variable != "height":
-                lat1, lat2 = self.latlims
-                lat  = self.file.select('latitude').get()
-                data = self.get_node(lat, data)
-            if variable == "height":
-                data = data
+        data = read_rows(sds_obj, index) # get sds data    
             
         return data 
 
@@ -314,6 +460,19 @@ class DARDAR(radarlidar):
         """
         N0star = self.get_data("N0star")
         return N0star    
+
+    @property    
+    def iwc(self):
+        """
+        gets IWC values for DARDAR pass
+
+        Returns
+        -------
+        iwc : np.array containing ice water content [kg m-3]
+
+        """
+        iwc = self.get_data("iwc")
+        return iwc    
     
     @property
     def time(self):
@@ -380,15 +539,30 @@ class DARDAR(radarlidar):
         
 class CLOUDSAT(radarlidar):
     
-    def __init__(self, filename, latlims = None, node = "A"):
+    def __init__(self, filename, latlims = None, node = "A", cache_size = None,
+                 provider = None):
+        """
+        reads Cloudsat 2B-GEOPROF granule, see radarlidar for parameters
         
-        super().__init__(filename, latlims , node )
+        provider : provider of the granule, see era2dardar.providers, 
+                   default reads the file with pansat
+        """
         
-        self.data = l2b_geoprof.open(self.filename)
+        super().__init__(filename, latlims , node, cache_size)
         
-    def get_data(self, variable):
+        if provider is None:
+            provider = providers.get_default()
+        
+        self.data = provider.cloudsat(self.filename)
+        
+        # node is searched once for all variables
+        if self.latlims is not None:
+            lat        = self.data.latitude.data
+            self.index = self.node_index(lat)
+        
+    def read(self, variable):
         """
-        get the data for the selected variable
+        read the data for the selected variable
 
         Parameters
         ----------
@@ -401,9 +575,8 @@ class CLOUDSAT(radarlidar):
         """ 
         
         data  = self.data[variable].data  
-        if self.latlims is not None:
-            lat  = self.data.latitude.data      
-            data = self.get_node(lat, data)
+        if self.index is not None:
+            data = data[self.index]
         return data        
 
     def get_node(self, lat, data):        
@@ -24,12 +24,14 @@ from typhon.topography import SRTM30
 from typhon import constants
 from typhon.physics.atmosphere import pressure2height
 from era2dardar.utils.scale_vmr import scale_vmr
-from scipy import interpolate
 from era2dardar.utils.convert_lon import shift_lon
 from era2dardar.utils.alt2pressure import pres2alt
 from era2dardar.utils.thermodynamics import mixr2vmr
 from era2dardar.utils.pt2z import pt2z
+from era2dardar.utils.regrid_profiles import height2logp, resample_profiles
 from era2dardar.ERA5_parameters import parameters
+from era2dardar.utils.cached_field import cached_field, field_input, invalidate
+from era2dardar.utils.cached_field import subset
 
 
 class atmdata():
@@ -43,7 +45,16 @@ class atmdata():
     """
     
 
-    def __init__(self, dardar, cloudsat, erap, eras, p_grid = None, domain  = None):
+    # inputs, assigning a new value invalidates the fields computed from it
+    dardar      = field_input()
+    cloudsat    = field_input()
+    erap        = field_input()
+    eras        = field_input()
+    p_grid      = field_input()
+    dtype       = field_input()
+
+    def __init__(self, dardar, cloudsat, erap, eras, p_grid = None, domain  = None,
+                 dtype = None):
         """
         
         Parameters
@@ -56,6 +67,14 @@ class atmdata():
         p_grid : np.array, the pressure grid over which ERA5 
         is to be interpolated. Units are in [Pa]
         If None, then the ERA5 grid is used [hard coded right now]       
+        dtype : dtype of the interpolated fields, e.g. np.float32 to halve
+        the memory of the fields. ERA5 fields are read, interpolated and 
+        regridded in dtype, z_field is integrated in float64 and returned
+        in dtype. None keeps float64
+
+        All fields are computed once and cached, assigning new inputs,
+        e.g. atm.p_grid = p, removes the cached fields depending on them.
+        After changing an input in place, call invalidate with its name.
 
         Returns
         -------
@@ -68,6 +87,7 @@ class atmdata():
         self.erap     = erap
         self.eras     = eras
         self.p_grid   = p_grid
+        self.dtype    = dtype
 
         self.domain  = domain
  
@@ -80,7 +100,131 @@ class atmdata():
         550,  600,  650,  700,  750,  775,  800,  825,  850,  875,  900,
         925,  950,  975, 1000, 1150]) * 100 # [Pa]
             
+    def invalidate(self, *names):
+        """
+        removes cached fields depending on the named inputs or fields
+
+        Parameters
+        ----------
+        names : strings, e.g. "p_grid", "dardar", "temperature", 
+                all cached fields are removed if no name is given
+
+        Returns
+        -------
+        None.
+
+        """
+        invalidate(self, *names)
+
+    def subset(self, dardar, cloudsat = None, rows = None):
+        """
+        atmdata of a part of the profiles, e.g. of one node of an orbit. 
+        The fields computed in self are sliced to the rows of the part, 
+        the other fields are computed when needed, with the same ERA5 data
+
+        Parameters
+        ----------
+        dardar : DARDAR instance of the part, e.g. from DARDAR.split_nodes
+                 with self.dardar as its store
+        cloudsat : CLOUDSAT instance of the part
+        rows : slice or np.array, rows of the part in the profiles of self,
+               default is dardar.rows
+
+        Returns
+        -------
+        atmdata instance
+
+        """
+        if rows is None:
+            rows = dardar.rows
+        if rows is None:
+            raise Exception("rows of the subset are not known")
+
+        atm = atmdata(dardar, cloudsat, self.erap, self.eras, self.p_grid,
+                      domain = self.domain, dtype = self.dtype)
+        subset(self, atm, rows)
+        return atm
+
+    def astype(self, field):
+        """
+        field converted to self.dtype, unchanged if dtype is None
+        """
+        if self.dtype is None:
+            return field
+        return np.asarray(field).astype(self.dtype, copy = False)
+
+    @cached_field("dardar", "erap", "dtype")
+    def plan_era5(self):
+        """
+        ScenePlan of the DARDAR track on the ERA5 pressure level grids and 
+        the ERA5 levels
 
+        Returns
+        -------
+        ScenePlan instance
+        """
+        return self.erap.scene_plan(self.dardar, dtype = self.dtype)
+
+    @cached_field("plan_era5", "p_grid")
+    def plan_p(self):
+        """
+        ScenePlan of the DARDAR track on the ERA5 pressure level grids and
+        p_grid. Shares the lat/lon brackets with plan_era5
+
+        Returns
+        -------
+        ScenePlan instance
+        """
+        return self.plan_era5.regrid(np.asarray(self.p_grid) * 0.01)
+    
+    @cached_field("dardar", "eras", "dtype")
+    def plan_s(self):
+        """
+        ScenePlan of the DARDAR track on the ERA5 surface grids, shared by 
+        all surface fields
+
+        Returns
+        -------
+        ScenePlan instance
+        """
+        return self.eras.scene_plan(self.dardar, dtype = self.dtype)
+
+    @cached_field("plan_era5", "erap", axis = 1)
+    def plevel_fields(self):
+        """
+        ERA5 pressure level variables interpolated to the DARDAR track on 
+        the ERA5 levels so far, filled by plevel for the variables needed 
+        by the fields. Interpolation to p_grid is then done by plan_p.vertical
+
+        Returns
+        -------
+        dictionary with ERA5 shortnames as keys and np.arrays with
+        dimensions [level, lat] as values
+        """
+        return {}
+
+    def plevel(self, shortname):
+        """
+        ERA5 pressure level variable interpolated to the DARDAR track on the
+        ERA5 levels, interpolated once and kept in plevel_fields
+
+        Parameters
+        ----------
+        shortname : string, ERA5 shortname, e.g. "t"
+
+        Returns
+        -------
+        np.array with dimensions [level, lat]
+        """
+        fields = self.plevel_fields
+        if shortname not in fields:
+            grid = self.erap.interpolate_many(self.dardar, [shortname], 
+                                              plan = self.plan_era5)
+            # read-only as the other cached fields
+            grid[shortname].flags.writeable = False
+            fields[shortname] = grid[shortname]
+        
+        return fields[shortname]
 
     @property    
     def t_0(self):
@@ -104,7 +248,7 @@ class atmdata():
         """
         return self.dardar.t_1
     
-    @property
+    @cached_field("dardar")
     def lon(self):
         """
         longitudes
@@ -120,7 +264,7 @@ class atmdata():
         
         return longitude
     
-    @property
+    @cached_field("dardar")
     def lat(self):
         """
         latitudes
@@ -131,7 +275,7 @@ class atmdata():
         """
         return self.dardar.latitude  
         
-    @property    
+    @cached_field("plan_p", "plevel_fields", axis = 1)
     def temperature(self):
         """
         interpolated ERA5 temperature fields to DARDAR grid and pressure grid
@@ -144,15 +288,14 @@ class atmdata():
 
         """
 
-        p           = self.p_grid        
         var         = "temperature"
         shortname   = parameters[var]
-        grid_t      = self.erap.interpolate(self.dardar, shortname,  p* 0.01)
+        grid_t      = self.plan_p.vertical(self.plevel(shortname))
         grid_t      = np.expand_dims(grid_t, 2)
         
         return grid_t
     
-    @property    
+    @cached_field("plan_p", "plevel_fields", "temperature", axis = 2)
     def clwc(self):
         """
         interpolated ERA5 CLWC fields to DARDAR grid and pressure grid
@@ -169,19 +312,19 @@ class atmdata():
             
         var         = "specific_cloud_liquid_water_content"
         shortname   = parameters[var]
-        grid_lwc    = self.erap.interpolate(self.dardar, shortname,  p* 0.01)
+        grid_lwc    = self.plan_p.vertical(self.plevel(shortname))
         
         grid_p      = np.tile(p, (grid_lwc.shape[1], 1))
         grid_p      = grid_p.T 
         A           = np.squeeze(self.temperature, axis = 2)
         rho         = thermodynamics.density(grid_p, A) #air density
-        grid_lwc    = grid_lwc * rho  #convert lwc units to mass concentration
+        grid_lwc    = self.astype(grid_lwc * rho)  #convert lwc units to mass concentration
         
         grid_lwc    = np.expand_dims(grid_lwc, axis = (0, 3))
         
         return grid_lwc
     
-    @property    
+    @cached_field("plan_p", "plevel_fields", axis = 2)
     def vmr_O3(self):
         """
         interpolated ERA5 ozone mass mixing ratio fields to DARDAR grid and pressure grid
@@ -196,11 +339,9 @@ class atmdata():
 
         """
         
-        p          = self.p_grid   
-            
         var        = "ozone_mass_mixing_ratio"
         shortname  = parameters[var]
-        grid_o3    = self.erap.interpolate(self.dardar, shortname, p * 0.01)
+        grid_o3    = self.plan_p.vertical(self.plevel(shortname))
 
         # molecular mass of ozone        
         M_w        = 48.0e-3 #[kg/mol]
@@ -227,7 +368,7 @@ class atmdata():
         
         return abs_species
 
-    @property
+    @cached_field("dardar", axis = 0)
     def z_surface_srtm(self):
         """
         z_surface fields interpolated to DARDAR grid.
@@ -249,7 +390,7 @@ class atmdata():
         
         return z_surface
     
-    @property
+    @cached_field("plan_s", "eras", axis = 0)
     def p_surface(self):
         """
         surface pressure fields interpolated to DARDAR grid.
@@ -263,12 +404,13 @@ class atmdata():
         
         var          = "surface_pressure"
         shortname    = parameters[var]
-        grid_sp      = self.eras.interpolate(self.dardar, shortname)
+        grid_sp      = self.eras.interpolate(self.dardar, shortname,
+                                           plan = self.plan_s)
         grid_sp      = np.expand_dims(grid_sp, axis = 1)
         
         return grid_sp   
 
-    @property
+    @cached_field("plan_s", "eras", "lat", "dtype", axis = 0)
     def z_surface(self):
         """
         surface pressure fields interpolated to DARDAR grid.
@@ -284,7 +426,9 @@ class atmdata():
         
         var         = "orography"
         shortname   = parameters[var]
-        grid_z      = self.eras.interpolate(self.dardar, shortname)
+        grid_z      = self.eras.interpolate(self.dardar, shortname,
+                                          plan = self.plan_s)
+        grid_z      = grid_z.astype(np.float64)
         
         lat = self.lat
         
@@ -296,14 +440,14 @@ class atmdata():
             
         rE  = 6378137./(1.006803-0.006706*s1**2)
         
-        grid_z = rE*( gE*rE / ( gE*rE - grid_z ) -1 )
+        grid_z = self.astype(rE*( gE*rE / ( gE*rE - grid_z ) -1 ))
         
         grid_z = np.expand_dims(grid_z, axis = 1)
 
         
         return grid_z
     
-    @property
+    @cached_field("plan_era5", "plevel_fields", axis = 0)
     def z0_p0(self):
         """
         reference altitude and pressure, needed to calculate z_field
@@ -318,7 +462,9 @@ class atmdata():
         var          = "geopotential"
         shortname    = parameters[var]
         
-        grid_z0      = np.squeeze(self.erap.interpolate(self.dardar, shortname, p_grid = [1000.0]))
+        plan         = self.plan_era5.regrid([1000.0])
+        grid_z0      = np.squeeze(plan.vertical(self.plevel(shortname)))
+        grid_z0      = grid_z0.astype(np.float64)
 
         p0           = np.ones(grid_z0.shape) * 1000 * 100 # [Pa] 
         
@@ -327,7 +473,8 @@ class atmdata():
         return z0, p0    
     
     
-    @property    
+    @cached_field("p_grid", "temperature", "vmr_h2o", "z0_p0", "lat", "dtype",
+                  axis = 1)
     def z_field(self):
         """
         geometrical altitudes, fulfilling hydrostatic equilibrium
@@ -339,24 +486,21 @@ class atmdata():
         dimensions [p, lat, lon]
 
         """
-        grid_t      = np.squeeze(self.temperature, axis = 2)
-        h2o         = np.squeeze(self.vmr_h2o, axis = (0, 3))
-        grid_z      = grid_t.copy()
+        # hydrostatic integration in float64
+        grid_t      = np.squeeze(self.temperature, axis = 2).astype(np.float64)
+        h2o         = np.squeeze(self.vmr_h2o, axis = (0, 3)).astype(np.float64)
         lat         = self.lat
         
         z0, p0      = self.z0_p0
         
-     
-        
-        for i in range(grid_t.shape[1]):
-            grid_z[:, i]      = (pt2z(self.p_grid, grid_t[:, i], 
-                                      h2o[:, i], p0[i], z0[i], lat[i]))
-        grid_z      = np.expand_dims(grid_z, 2) 
+        # all profiles in one call
+        grid_z      = pt2z(self.p_grid, grid_t, h2o, p0, z0, lat)
+        grid_z      = np.expand_dims(self.astype(grid_z), 2) 
         
         return grid_z
     
     
-    @property
+    @cached_field("plan_s", "eras", axis = 0)
     def skin_temperature(self):
         """
         ERA5 skin temperature fields interpolated to DARDAR grid.
@@ -370,12 +514,13 @@ class atmdata():
         var           = "skin_temperature"
         shortname     = parameters[var]
 
-        grid_skt      = self.eras.interpolate(self.dardar, shortname)
+        grid_skt      = self.eras.interpolate(self.dardar, shortname,
+                                            plan = self.plan_s)
         grid_skt      = np.expand_dims(grid_skt, axis = 1)
         
         return grid_skt
 
-    @property
+    @cached_field("plan_s", "eras", axis = 0)
     def t2m(self):
         """
         ERA5 2m temperature fields interpolated to DARDAR grid.
@@ -388,32 +533,50 @@ class atmdata():
         """
         var           = "2m_temperature"
         shortname     = parameters[var]        
-        grid_t2m      = self.eras.interpolate(self.dardar, shortname)
+        grid_t2m      = self.eras.interpolate(self.dardar, shortname,
+                                            plan = self.plan_s)
         grid_t2m      = np.expand_dims(grid_t2m, axis = 1)
         
         return grid_t2m
 
-    @property
-    def wind_speed(self):
+    @cached_field("plan_s", "eras", axis = 0)
+    def wind_components(self):
         """
         ERA5 10m u and v fields interpolated to DARDAR grid.
-        The wind speed is calculated from u and v vectors
        
         Returns
         -------
-        wind_speed : np.array containing the interpolated values
-        dimensions [lat, lon]
+        grid_u, grid_v : np.arrays containing the interpolated values
+        dimensions [lat]
 
         """
         # u 10m 
         var           = "10m_u_component_of_wind"
         shortname     = parameters[var]
-        grid_u        = self.eras.interpolate(self.dardar, shortname)
+        grid_u        = self.eras.interpolate(self.dardar, shortname,
+                                            plan = self.plan_s)
         
         # v 10 m 
         var           = "10m_v_component_of_wind"
         shortname     = parameters[var]
-        grid_v        = self.eras.interpolate(self.dardar, shortname)
+        grid_v        = self.eras.interpolate(self.dardar, shortname,
+                                            plan = self.plan_s)
+        
+        return grid_u, grid_v
+
+    @cached_field("wind_components", axis = 0)
+    def wind_speed(self):
+        """
+        ERA5 10m u and v fields interpolated to DARDAR grid.
+        The wind speed is calculated from u and v vectors
+       
+        Returns
+        -------
+        wind_speed : np.array containing the interpolated values
+        dimensions [lat, lon]
+
+        """
+        grid_u, grid_v = self.wind_components
         
         # convert to wind speed
         wind_speed    = np.sqrt(grid_u**2 + grid_v**2)
@@ -421,7 +584,7 @@ class atmdata():
         
         return wind_speed
     
-    @property    
+    @cached_field("wind_components", axis = 0)
     def wind_direction(self):
         """
         ERA5 10m u and v fields interpolated to DARDAR grid.
@@ -433,16 +596,7 @@ class atmdata():
         dimensions [lat, lon]
 
         """
-        
-        # u 10m 
-        var           = "10m_u_component_of_wind"
-        shortname     = parameters[var]
-        grid_u        = self.eras.interpolate(self.dardar, shortname)
-        
-        # v 10 m 
-        var           = "10m_v_component_of_wind"
-        shortname     = parameters[var]
-        grid_v        = self.eras.interpolate(self.dardar, shortname)
+        grid_u, grid_v = self.wind_components
         
         # convert to wind direction
         wind_dir      = np.arctan2(grid_u, grid_v) * 180 / np.pi  # degree
@@ -451,7 +605,7 @@ class atmdata():
         
         return wind_dir
     
-    @property
+    @cached_field("plan_p", "plevel_fields", axis = 2)
     def vmr_h2o(self):   
         """
         interpolated ERA5 VMR fields to DARDAR grid and pressure grid
@@ -475,25 +629,20 @@ class atmdata():
 
         """
         
-        p               = self.p_grid   
-        
         var             = "specific_humidity"
         shortname       = parameters[var]        
 
-        grid_q          = self.erap.interpolate(self.dardar, shortname, p_grid = None)
+        grid_q          = self.plevel(shortname)
         q2vmr           = thermodynamics.specific_humidity2vmr(grid_q)    
-        p_era           = self.erap.era["level"].data * 100 # Pa
 
         # interpolate log(vmr) as a function of log(p)     
-
-        f_q             =  interpolate.interp1d(np.log(p_era), np.log(q2vmr), axis = 0 )
-        grid_q2vmr      =  np.exp(f_q(np.log(p)))
+        grid_q2vmr      = self.plan_p.vertical(q2vmr, logspace = True)
         
         grid_q2vmr      = np.expand_dims(grid_q2vmr, axis = (0, 3))
         
         return grid_q2vmr
     
-    @property
+    @cached_field("vmr_h2o", axis = 2)
     def vmr_N2(self):
         """
         VMR values for N2.
@@ -505,14 +654,14 @@ class atmdata():
         """        
         grid_q2vmr       = self.vmr_h2o
         
-        grid_N2          = np.ones(grid_q2vmr.shape) * 0.781 # vmr N2
+        grid_N2          = np.ones(grid_q2vmr.shape, grid_q2vmr.dtype) * 0.781 # vmr N2
         
         grid_N2          = scale_vmr(grid_N2, grid_q2vmr)
         
         return grid_N2
 
         
-    @property    
+    @cached_field("vmr_h2o", axis = 2)
     def vmr_O2(self): 
         """
         VMR values for O2.
@@ -526,13 +675,42 @@ class atmdata():
         grid_q2vmr       = self.vmr_h2o
         
         
-        grid_O2         = np.ones(grid_q2vmr.shape) * 0.209 # vmr O2
+        grid_O2         = np.ones(grid_q2vmr.shape, grid_q2vmr.dtype) * 0.209 # vmr O2
 
         grid_O2         = scale_vmr(grid_O2, grid_q2vmr)
         
         return grid_O2
     
         
+    @cached_field("dardar", "p_grid", "z_field", axis = 0)
+    def logp_dardar(self):
+        """
+        log pressure at DARDAR heights for each profile, from z_field.
+        Computed once and shared by iwc, N0star and Z_dardar
+        
+        Returns
+        -------
+        p_d : np.array [lat, height] containing log of pressure [Pa]
+        """
+        height_d        = self.dardar.height
+        z_field         = np.squeeze(self.z_field, axis = 2)
+        
+        return height2logp(z_field, self.p_grid, height_d)
+
+    @cached_field("cloudsat", "p_grid", "z_field", axis = 0)
+    def logp_cloudsat(self):
+        """
+        log pressure at Cloudsat heights for each profile, from z_field
+        
+        Returns
+        -------
+        p_d : np.array [lat, height] containing log of pressure [Pa]
+        """
+        height_d        = self.cloudsat.height
+        z_field         = np.squeeze(self.z_field, axis = 2)
+        
+        return height2logp(z_field, self.p_grid, height_d)
+        
 #    @property
     def iwc(self,  z_field = None):
         """
@@ -553,24 +731,18 @@ class atmdata():
             
         if z_field is not None:
             print ("file provided")
+            p_d             = height2logp(z_field, p, height_d)
         else:    
-            z_field         = np.squeeze(self.z_field)  
+            p_d             = self.logp_dardar
         
-        grid_iwc = np.zeros(z_field.shape)
-        
-        for i in range(self.lat.shape[0]):
-            # first interpolate dardar heights to pressures using z_field and p_grid
-            f                 = interpolate.interp1d(z_field[:, i], np.log(p), fill_value  = "extrapolate")
-            p_d               = f(height_d) # log scale
-            # using dardar pressure levels to interpolate reflectivities to p_grid 
-            f                 = interpolate.interp1d(p_d, iwc[i, :], fill_value = "extrapolate")
-            grid_iwc[:, i]    = f(np.log(p))
+        # using dardar pressure levels to interpolate iwc to p_grid 
+        grid_iwc        = resample_profiles(p_d, p, iwc, self.dtype)
         
         grid_iwc        = np.expand_dims(grid_iwc, axis = (0, 3))
        
         return grid_iwc       
 
-    @property
+    @cached_field("logp_dardar", "dardar", "p_grid", "dtype", axis = 2)
     def N0star(self):
         """
         The N0star data from DARDAR interpolated to pressure grid defined in
@@ -584,21 +756,12 @@ class atmdata():
         
         try:
             N0star          = self.dardar.N0star
-            height_d        = self.dardar.height
         except:
             print ("N0Star not available as class method/property")
             
-        z_field = np.squeeze(self.z_field)  
-        
-        grid_N0star = np.zeros(z_field.shape)
-    
-        for i in range(self.lat.shape[0]):
-            # first interpolate dardar heights to pressures using z_field and p_grid
-            f                 = interpolate.interp1d(z_field[:, i], np.log(p), fill_value  = "extrapolate")
-            p_d               = f(height_d) # log scale
-            # using dardar pressure levels to interpolate reflectivities to p_grid 
-            f                 = interpolate.interp1d(p_d, N0star[i, :], fill_value = "extrapolate")
-            grid_N0star[:, i]    = f(np.log(p))
+        # using dardar pressure levels to interpolate N0star to p_grid 
+        grid_N0star     = resample_profiles(self.logp_dardar, p, N0star, 
+                                            self.dtype)
 
         grid_N0star        = np.expand_dims(grid_N0star, axis = (0, 3))
        
@@ -626,18 +789,12 @@ class atmdata():
 
         if z_field is not None:
             print ("file provided")
+            p_d             = height2logp(z_field, p, height_d)
         else:    
-            z_field         = np.squeeze(self.z_field)  
+            p_d             = self.logp_dardar
             
-        grid_z          = np.zeros(z_field.shape)
-
-        for i in range(self.lat.shape[0]):
-            # first interpolate dardar heights to pressures using z_field and p_grid
-            f               = interpolate.interp1d(z_field[:, i], np.log(p), fill_value  = "extrapolate")
-            p_d             = f(height_d) # log scale
-            # using dardar pressure levels to interpolate reflectivities to p_grid 
-            f               = interpolate.interp1d(p_d, Z[i, :], fill_value = "extrapolate")
-            grid_z[:, i]    = f(np.log(p))
+        # using dardar pressure levels to interpolate reflectivities to p_grid 
+        grid_z          = resample_profiles(p_d, p, Z, self.dtype)
     
         grid_z          = np.expand_dims(grid_z, axis = (0, 3))
        
@@ -664,18 +821,12 @@ class atmdata():
 
         if z_field is not None:
             print ("file provided")
+            p_d             = height2logp(z_field, p, height_d)
         else:    
-            z_field         = np.squeeze(self.z_field)  
+            p_d             = self.logp_cloudsat
             
-        grid_z          = np.zeros(z_field.shape)
-
-        for i in range(self.lat.shape[0]):
-            # first interpolate dardar heights to pressures using z_field and p_grid
-            f               = interpolate.interp1d(z_field[:, i], np.log(p), fill_value  = "extrapolate")
-            p_d             = f(height_d[i]) # log scale
-            # using dardar pressure levels to interpolate reflectivities to p_grid 
-            f               = interpolate.interp1d(p_d, Z[i, :], fill_value = "extrapolate")
-            grid_z[:, i]    = f(np.log(p))
+        # using cloudsat pressure levels to interpolate reflectivities to p_grid 
+        grid_z          = resample_profiles(p_d, p, Z, self.dtype)
     
         zlim            = 10 ** (-99/10) # fillvalue equivalent to -99 dbZ
         grid_z          = np.where(np.isnan(grid_z), zlim, grid_z)
@@ -701,7 +852,9 @@ class atmdata():
         p           = self.p_grid        
         var         = variable
         shortname    = parameters[var]
-        grid_t      = self.erap.ERA_t.interpolate(self.dardar,shortname,  p* 0.01)
+        grid_t      = self.erap.interpolate(self.dardar,shortname,  p* 0.01,
+                                            method = method,
+                                            plan = self.plan_p)
         grid_t      = np.expand_dims(grid_t, 2)         
         return grid_t
     
@@ -722,12 +875,49 @@ class atmdata():
         var           = variable
         shortname     = parameters[var]
 
-        grid_t        = self.eras.interpolate(self.dardar, shortname, method = method)
+        grid_t        = self.eras.interpolate(self.dardar, shortname, method = method,
+                                            plan = self.plan_s)
         grid_t        = np.expand_dims(grid_t, axis = 1)
         
         return grid_t
     
-    @property
+    @cached_field("plan_s", "eras", axis = 0)
+    def surface_nearest(self):
+        """
+        ERA5 land/sea mask, sea ice cover and snow depth interpolated to 
+        DARDAR grid with "nearest" method, in one gather of the nearest 
+        ERA5 cells. Only the variables loaded in eras are interpolated.
+        The land/sea mask is set to 1 over land (> 0.5) and 0 over sea,
+        sea ice cover is set to 0 where not defined, e.g. over land
+       
+        Returns
+        -------
+        dictionary with ERA5 shortnames as keys and np.arrays with 
+        dimensions [lat] as values
+
+        """
+        shortnames    = [parameters[var] for var in 
+                         ["land_sea_mask", "sea_ice_cover", "snow_depth"]
+                         if parameters[var] in self.eras.shortname]
+        
+        grid          = self.eras.interpolate_many(self.dardar, shortnames, 
+                                                   method = "nearest",
+                                                   plan = self.plan_s)
+        
+        lsm           = parameters["land_sea_mask"]
+        if lsm in grid:
+            grid_lsm      = grid[lsm]
+            grid[lsm]     = np.where(grid_lsm > 0.5, 1, 
+                                     np.where(grid_lsm <= 0.5, 0, grid_lsm))
+            
+        sic           = parameters["sea_ice_cover"]
+        if sic in grid:
+            grid_sic      = grid[sic]
+            grid[sic]     = np.where(np.isfinite(grid_sic), grid_sic, 0)
+        
+        return grid
+    
+    @cached_field("surface_nearest", axis = 0)
     def sea_ice_cover(self):
         """
         ERA5 sea_ice cover fields interpolated to DARDAR grid.
@@ -740,14 +930,12 @@ class atmdata():
         """
         var           = "sea_ice_cover"
         shortname     = parameters[var]
-        grid_sic      = self.eras.interpolate(self.dardar,shortname, method ="nearest")
-        imask         = np.isfinite(grid_sic)
-        grid_sic[~imask] = 0
+        grid_sic      = self.surface_nearest[shortname]
         grid_sic      = np.expand_dims(grid_sic, axis = 1)
         
         return grid_sic
     
-    @property
+    @cached_field("surface_nearest", axis = 0)
     def lsm(self):
         """
         ERA5 land/sea mask fields interpolated to DARDAR gri d with "nearest"
@@ -761,19 +949,12 @@ class atmdata():
         """
         var           = "land_sea_mask"
         shortname     = parameters[var]
-        grid_lsm      = self.eras.interpolate(self.dardar,shortname, method ="nearest")
-        
-        iland         = grid_lsm > 0.5
-        isea          = grid_lsm <= 0.5
-        
-        
-        grid_lsm[iland]  = 1
-        grid_lsm[isea]   = 0
+        grid_lsm      = self.surface_nearest[shortname]
         grid_lsm      = np.expand_dims(grid_lsm, axis = 1)
         
         return grid_lsm
     
-    @property
+    @cached_field("surface_nearest", axis = 0)
     def snow_depth(self):
         """
         ERA5 snow depth fields interpolated to DARDAR grid.
@@ -786,7 +967,7 @@ class atmdata():
         """
         var          = "snow_depth"
         shortname     = parameters[var]
-        grid_sd      = self.eras.interpolate(self.dardar,shortname, method ="nearest")
+        grid_sd      = self.surface_nearest[shortname]
         grid_sd      = np.expand_dims(grid_sd, axis = 1)
         
         return grid_sd   
@@ -16,7 +16,8 @@ from era2dardar.utils.Z2dbZ import Z2dbZ
 
 
 
-def dardar2atmdata(dardar, cloudsat, erap, eras, p_grid, domain = None):
+def dardar2atmdata(dardar, cloudsat, erap, eras, p_grid, domain = None,
+                   atm = None):
     """
     This method interpolates different fields to DARDAR grid and saves them
     to be in ARTS xml format.
@@ -29,6 +30,10 @@ def dardar2atmdata(dardar, cloudsat, erap, eras, p_grid, domain = None):
     dardarFile : DARDAR class instance
 
     p_grid     : np.array containing pressure levels for ARTS data [Pa]
+    
+    atm        : atmdata instance to use instead of a new one, e.g. 
+                 a node from atmdata.subset of an orbit, then dardar, 
+                 cloudsat, erap, eras, p_grid and domain are not used
 
     Returns
     -------
@@ -36,7 +41,8 @@ def dardar2atmdata(dardar, cloudsat, erap, eras, p_grid, domain = None):
 
     """
 
-    atm             = atmdata(dardar, erap, eras, p_grid, domain = domain)
+    if atm is None:
+        atm         = atmdata(dardar, cloudsat, erap, eras, p_grid, domain = domain)
     vmr_h2o         = atm.vmr_h2o
     vmr_N2          = atm.vmr_N2
     vmr_O2          = atm.vmr_O2
@@ -58,7 +64,7 @@ def dardar2atmdata(dardar, cloudsat, erap, eras, p_grid, domain = None):
                          "p_grid"          : atm.p_grid,
                          "t_field"         : atm.temperature,
                          "z_field"         : atm.z_field,
-                         "lwc"             : atm.clwc,
+                         "lwc"             : lwc,
                          "skt"             : atm.skin_temperature,
                          "t2m"             : atm.t2m,
                          "wind_speed"      : atm.wind_speed,
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+Data providers behind ERA5p, ERA5s and CLOUDSAT.
+
+A provider gives
+    era5(levels, variables, domain) : an object with the interface of
+        pansat ERA5Hourly, i.e. download(t_0, t_1) returning the files of
+        the hours from t_0 to t_1 and open(filename) returning an 
+        xarray.Dataset. Files may hold several hours, e.g. a day
+    cloudsat(filename) : the 2B-GEOPROF granule as xarray.Dataset, as
+        pansat l2b_geoprof.open
+
+PansatProvider downloads and reads the data with pansat and is the default.
+LocalProvider generates synthetic ERA5 files and 2B-GEOPROF granules with
+the dimensions, level and latitude order and shortnames of the real data,
+so that the processing can be run and timed without network access.
+
+Example
+-------
+from era2dardar import providers
+providers.set_default(providers.LocalProvider("synthetic"))
+
+@author: inderpreet
+"""
+
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import xarray
+from scipy.constants import g
+from era2dardar.ERA5_parameters import parameters
+from era2dardar.utils.alt2pressure import pres2alt
+
+
+# pressure levels of ERA5 [hPa]
+ERA5_LEVELS = np.array([1, 2, 3, 5, 7, 10, 20, 30, 50, 70, 100, 125, 150, 175,
+                        200, 225, 250, 300, 350, 400, 450, 500, 550, 600, 650,
+                        700, 750, 775, 800, 825, 850, 875, 900, 925, 950, 975,
+                        1000])
+
+
+class PansatProvider():
+    """
+    ERA5 and Cloudsat data from pansat
+    """
+
+    def era5(self, levels, variables, domain = None):
+        """
+        pansat ERA5Hourly product
+
+        Parameters
+        ----------
+        levels : "pressure" or "surface"
+        variables : list of ERA5 longnames
+        domain : None or [lat1, lat2, lon1, lon2]
+
+        Returns
+        -------
+        ERA5Hourly instance
+
+        """
+        from pansat.products.reanalysis.era5 import ERA5Hourly
+        return ERA5Hourly(levels, variables, domain = domain)
+
+    def cloudsat(self, filename):
+        """
+        reads 2B-GEOPROF granule with pansat
+
+        Parameters
+        ----------
+        filename : Cloudsat 2B-GEOPROF file
+
+        Returns
+        -------
+        xarray.Dataset
+
+        """
+        from pansat.products.satellite.cloud_sat import l2b_geoprof
+        return l2b_geoprof.open(filename)
+
+
+class LocalProvider():
+    """
+    synthetic ERA5 files and 2B-GEOPROF granules
+    """
+
+    def __init__(self, path = "synthetic", resolution = 0.25, daily = False):
+        """
+        Parameters
+        ----------
+        path : directory where the synthetic ERA5 files are written
+        resolution : float, grid spacing of ERA5 files [deg]
+        daily : if True, ERA5 files hold the 24 hours of a day, 
+                otherwise one hour
+
+        Returns
+        -------
+        None.
+
+        """
+        self.path       = path
+        self.resolution = resolution
+        self.daily      = daily
+
+    def era5(self, levels, variables, domain = None):
+        """
+        synthetic ERA5 product with the interface of ERA5Hourly
+
+        Parameters
+        ----------
+        levels : "pressure" or "surface"
+        variables : list of ERA5 longnames
+        domain : None or [lat1, lat2, lon1, lon2]
+
+        Returns
+        -------
+        LocalERA5 instance
+
+        """
+        return LocalERA5(levels, variables, domain, self.path, self.resolution,
+                         self.daily)
+
+    def cloudsat(self, filename):
+        """
+        synthetic 2B-GEOPROF granule for the start time in filename,
+        see synthetic_geoprof
+
+        Parameters
+        ----------
+        filename : Cloudsat 2B-GEOPROF filename, the file is not read
+
+        Returns
+        -------
+        xarray.Dataset
+
+        """
+        name  = os.path.basename(filename).split("_")[0]
+        start = datetime.strptime(name, "%Y%j%H%M%S")
+        return synthetic_geoprof(start)
+
+
+class LocalERA5():
+    """
+    writes and opens synthetic ERA5 files, one file per hour or per day
+    """
+
+    def __init__(self, levels, variables, domain = None, path = "synthetic",
+                 resolution = 0.25, daily = False):
+
+        if levels not in ["pressure", "surface"]:
+            raise ValueError("levels should be 'pressure' or 'surface'")
+
+        self.levels     = levels
+        self.variables  = list(variables)
+        self.domain     = domain
+        self.resolution = resolution
+        self.daily      = daily
+
+        if levels == "pressure":
+            self.name = "reanalysis-era5-pressure-levels"
+        else:
+            self.name = "reanalysis-era5-single-levels"
+
+        self.path = os.path.join(path, "ERA5", self.name)
+
+    def download(self, start, end, destination = None):
+        """
+        writes the files of the hours from start to end, one file for each
+        hour or each day, existing files are kept
+
+        Parameters
+        ----------
+        start : datetime.datetime object, start time
+        end : datetime.datetime object, end time
+        destination : directory of the files, default path/ERA5/<name>
+
+        Returns
+        -------
+        list of filenames
+
+        """
+        path = self.path if destination is None else destination
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        domain = ""
+        if self.domain is not None:
+            domain = "_" + "-".join(str(float(d)) for d in self.domain)
+
+        hour  = start.replace(minute = 0, second = 0, microsecond = 0)
+        files = []
+        while hour <= end:
+            if self.daily:
+                first = hour.replace(hour = 0)
+                hours = [first + timedelta(hours = i) for i in range(24)]
+                stamp = first.strftime("%Y%m%d")
+            else:
+                hours = [hour]
+                stamp = hour.strftime("%Y%m%d%H")
+
+            filename = os.path.join(path, (self.name + "_" + stamp + "_"
+                                           + "-".join(self.variables)
+                                           + domain + ".nc"))
+            if not os.path.isfile(filename):
+                self.write(filename, hours)
+            if filename not in files:
+                files.append(filename)
+            hour += timedelta(hours = 1)
+
+        return files
+
+    def open(self, filename):
+        """
+        opens ERA5 file as xarray.Dataset
+        """
+        return xarray.open_dataset(filename)
+
+    def grid(self):
+        """
+        latitudes in descending and longitudes in ascending order, as in
+        ERA5 files. Global files have longitudes from 0 to 360
+        """
+        res = self.resolution
+        if self.domain is None:
+            lat1, lat2, lon1, lon2 = -90.0, 90.0, 0.0, 360.0 - res
+        else:
+            lat1, lat2, lon1, lon2 = [float(d) for d in self.domain]
+
+        lat = lat2 - res * np.arange(int(round((lat2 - lat1) / res)) + 1)
+        lon = lon1 + res * np.arange(int(round((lon2 - lon1) / res)) + 1)
+
+        return lat, lon
+
+    def write(self, filename, hours):
+        """
+        writes synthetic fields of all variables for a list of hours
+        """
+        lat, lon = self.grid()
+        coords   = {"time"      : np.array(hours, dtype = "datetime64[ns]"),
+                    "latitude"  : lat.astype(np.float32),
+                    "longitude" : lon.astype(np.float32)}
+
+        if self.levels == "pressure":
+            coords["level"] = ERA5_LEVELS.astype(np.int32)
+            dims = ("time", "level", "latitude", "longitude")
+        else:
+            dims = ("time", "latitude", "longitude")
+
+        data = {}
+        for variable in self.variables:
+            shortname = parameters[variable]
+            if self.levels == "pressure":
+                field = [pressure_field(shortname, ERA5_LEVELS, lat, lon, hour)
+                         for hour in hours]
+            else:
+                field = [surface_field(shortname, lat, lon, hour)
+                         for hour in hours]
+            data[shortname] = (dims, np.stack(field).astype(np.float32))
+
+        xarray.Dataset(data, coords = coords).to_netcdf(filename)
+
+
+def _pattern(lat, lon, hour):
+    """
+    smooth pattern in [-1, 1] moving with time, [lat, lon]
+    """
+    la = np.deg2rad(lat)[:, np.newaxis]
+    lo = np.deg2rad(lon)[np.newaxis, :] + 2 * np.pi * hour.hour / 24
+    return 0.6 * np.sin(2 * lo) * np.cos(la) + 0.4 * np.sin(3 * la + lo)
+
+
+def _land(lat, lon):
+    """
+    synthetic land fraction [lat, lon]
+    """
+    la = np.deg2rad(lat)[:, np.newaxis]
+    lo = np.deg2rad(lon)[np.newaxis, :]
+    return np.clip(2 * (0.6 * np.sin(3 * lo) * np.cos(2 * la)
+                        + 0.5 * np.sin(5 * la + 4 * lo)),
+                   0, 1)
+
+
+def pressure_field(shortname, level, lat, lon, hour):
+    """
+    synthetic ERA5 pressure level field
+
+    Parameters
+    ----------
+    shortname : ERA5 shortname
+    level : np.array, pressure levels [hPa]
+    lat : np.array, latitudes [deg]
+    lon : np.array, longitudes [deg]
+    hour : datetime object
+
+    Returns
+    -------
+    np.array [level, lat, lon]
+
+    """
+    p      = level[:, np.newaxis, np.newaxis].astype(np.float64)
+    z      = pres2alt(p * 100)
+    coslat = np.cos(np.deg2rad(lat))[np.newaxis, :, np.newaxis]
+    wave   = _pattern(lat, lon, hour)[np.newaxis]
+
+    # temperature decreasing to the tropopause, increasing above 20 km
+    t_surf = 250 + 50 * coslat + 3 * wave
+    t      = np.maximum(t_surf - 6.5e-3 * z, 205 + 10 * coslat)
+    t      = t + np.maximum(z - 20e3, 0) * 1.5e-3
+
+    if shortname == "t":
+        return t
+    if shortname == "z":
+        return g * (z + 60 * coslat * wave)
+    if shortname == "q":
+        return np.maximum(0.018 * coslat ** 3 * (p / 1000) ** 3.5
+                          * (1 + 0.3 * wave), 2.5e-6)
+    if shortname == "r":
+        return np.clip(80 * (p / 1000) * (1 + 0.3 * wave), 0, 100)
+    if shortname == "ciwc":
+        return 2e-5 * np.exp(-((p - 300) / 80) ** 2) * np.maximum(wave, 0)
+    if shortname == "clwc":
+        return 2e-4 * np.exp(-((p - 850) / 80) ** 2) * np.maximum(wave, 0)
+    if shortname == "o3":
+        return (1.2e-5 * np.exp(-((np.log(p) - np.log(10)) / 1.2) ** 2)
+                * (1 + 0.1 * wave) + 5e-8)
+
+    raise Exception("no synthetic pressure level field for ", shortname)
+
+
+def surface_field(shortname, lat, lon, hour):
+    """
+    synthetic ERA5 surface field
+
+    Parameters
+    ----------
+    shortname : ERA5 shortname
+    lat : np.array, latitudes [deg]
+    lon : np.array, longitudes [deg]
+    hour : datetime object
+
+    Returns
+    -------
+    np.array [lat, lon]
+
+    """
+    land   = _land(lat, lon)
+    wave   = _pattern(lat, lon, hour)
+    la     = np.deg2rad(lat)[:, np.newaxis]
+    height = 1500 * land * (1 + np.sin(5 * la))
+    t2m    = 300 - 50 * np.sin(la) ** 2 + 5 * wave - 6.5e-3 * height
+
+    if shortname == "lsm":
+        return land
+    if shortname == "z":
+        return g * height
+    if shortname == "sp":
+        return 101325 * np.exp(-height / 8000) * (1 + 0.01 * wave)
+    if shortname == "skt":
+        return t2m + 2 * wave
+    if shortname == "t2m":
+        return t2m
+    if shortname == "u10":
+        return -6 * np.cos(3 * la) + 3 * wave
+    if shortname == "v10":
+        return 4 * np.sin(2 * la) * wave
+    if shortname == "siconc":
+        ice = np.clip((np.abs(np.rad2deg(la)) - 60) / 10, 0, 1) + 0 * wave
+        return np.where(land > 0.5, np.nan, ice)
+    if shortname == "sd":
+        return np.where(land > 0.5, np.maximum(273 - t2m, 0) * 5e-3, 0)
+    if shortname == "tcwv":
+        return 2 + 50 * np.cos(la) ** 4 * (1 + 0.3 * wave)
+
+    raise Exception("no synthetic surface field for ", shortname)
+
+
+def synthetic_geoprof(start, n_rays = 37088, n_bins = 125):
+    """
+    synthetic 2B-GEOPROF granule, one sun-synchronous orbit starting at the
+    ascending equator crossing. Variables are named as in pansat l2b_geoprof,
+    radar_reflectivity is in hundredths of dBZe with -8888 for no echo
+
+    Parameters
+    ----------
+    start : datetime object, start time of the granule
+    n_rays : int, number of profiles
+    n_bins : int, number of range bins
+
+    Returns
+    -------
+    xarray.Dataset
+
+    """
+    period      = 5933.0 # orbit period [s]
+    inclination = np.deg2rad(98.2)
+
+    time     = np.arange(n_rays) * (period / n_rays)
+    phase    = 2 * np.pi * time / period
+
+    lat      = np.rad2deg(np.arcsin(np.sin(inclination) * np.sin(phase)))
+
+    # ascending node at 13:30 local time, earth rotates below the orbit
+    ut       = start.hour + start.minute / 60 + start.second / 3600
+    lon0     = 15 * (13.5 - ut)
+    lon      = (lon0 + np.rad2deg(np.arctan2(np.cos(inclination) * np.sin(phase),
+                                             np.cos(phase)))
+                - 360 * time / 86164)
+    lon      = (lon + 180) % 360 - 180
+
+    # bins from top of atmosphere to the surface
+    surface  = 200 * (1 + np.sin(phase * 7))
+    height   = (surface[:, np.newaxis]
+                + 239.8 * np.arange(n_bins - 1, -1, -1)[np.newaxis, :])
+
+    # a cloud layer between 6 and 10 km where the pattern is positive
+    cloud    = np.sin(phase * 40)[:, np.newaxis] > 0.2
+    layer    = (height > 6e3) & (height < 10e3)
+    dbz      = -20 + 30 * np.sin(phase * 40)[:, np.newaxis] * (height - 6e3) / 4e3
+    dbz      = np.where(cloud & layer, dbz, -88.88)
+
+    data = {"latitude"           : (("rays",), lat.astype(np.float32)),
+            "longitude"          : (("rays",), lon.astype(np.float32)),
+            "time_since_start"   : (("rays",), time.astype(np.float32)),
+            "height"             : (("rays", "bins"), height.astype(np.int16)),
+            "radar_reflectivity" : (("rays", "bins"),
+                                    np.round(dbz * 100).astype(np.int16))}
+
+    return xarray.Dataset(data)
+
+
+default = PansatProvider()
+
+
+def set_default(provider):
+    """
+    sets the provider used when ERA5p, ERA5s or CLOUDSAT are created
+    without provider
+    """
+    global default
+    default = provider
+
+
+def get_default():
+    """
+    provider used when ERA5p, ERA5s or CLOUDSAT are created without provider
+    """
+    return default
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+Memoized fields with explicit dependencies.
+
+cached_field is used like property, but the value is computed only once and
+kept in the instance cache. Each field names the inputs and other fields it
+is computed from. Assigning a field_input, or calling invalidate, removes the
+cached values of all fields depending on it, directly or through other fields.
+Fields with a profile axis can be sliced to a part of the profiles with
+subset, e.g. from an orbit to its nodes.
+
+Example
+-------
+class scene():
+    p_grid = field_input()
+
+    @cached_field("p_grid", axis = 1)
+    def z(self):
+        ...
+
+@author: inderpreet
+"""
+
+import numpy as np
+
+
+def _freeze(value):
+    """
+    cached arrays are set to read-only, so that changes in place by the
+    caller do not modify the cache
+    """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for v in value:
+            _freeze(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    return value
+
+
+def _cache(obj):
+    return obj.__dict__.setdefault("_cache", {})
+
+
+def dependents(cls, names):
+    """
+    all cached fields of cls which depend on names, directly or indirectly
+
+    Parameters
+    ----------
+    cls : class containing cached_field attributes
+    names : iterable of input or field names
+
+    Returns
+    -------
+    set of field names
+
+    """
+    fields = {}
+    for klass in reversed(cls.__mro__):
+        for key, value in vars(klass).items():
+            if isinstance(value, cached_field):
+                fields[key] = set(value.depends)
+
+    found   = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for key, depends in fields.items():
+            if key not in found and depends & found:
+                found.add(key)
+                changed = True
+
+    return found & set(fields)
+
+
+def _take(value, rows, axis):
+    """
+    rows of value along axis, value is an array, or a tuple or dictionary
+    of arrays
+    """
+    if isinstance(value, tuple):
+        return tuple(_take(v, rows, axis) for v in value)
+    if isinstance(value, dict):
+        return {k : _take(v, rows, axis) for k, v in value.items()}
+
+    index       = [slice(None)] * np.ndim(value)
+    index[axis] = rows
+    return value[tuple(index)]
+
+
+def subset(obj, other, rows):
+    """
+    copies the cached fields of obj with a profile axis to the cache of
+    other, sliced to rows. Fields without axis, and fields not computed in
+    obj, are computed by other when needed
+
+    Parameters
+    ----------
+    obj : instance of a class with cached_field attributes
+    other : instance of the same class, for a part of the profiles of obj
+    rows : slice or np.array of the profiles of obj in other
+
+    Returns
+    -------
+    None.
+
+    """
+    cache = _cache(obj)
+    for klass in reversed(type(obj).__mro__):
+        for key, value in vars(klass).items():
+            if (isinstance(value, cached_field) and value.axis is not None
+                and key in cache):
+                _cache(other)[key] = _freeze(_take(cache[key], rows,
+                                                   value.axis))
+
+
+def invalidate(obj, *names):
+    """
+    removes the named fields, and all fields depending on the named
+    inputs or fields, from the cache of obj
+
+    Parameters
+    ----------
+    obj : instance of a class with cached_field attributes
+    names : strings, names of inputs or fields, all fields if empty
+
+    Returns
+    -------
+    None.
+
+    """
+    cache = _cache(obj)
+    if not names:
+        cache.clear()
+        return
+
+    for key in set(names) | dependents(type(obj), names):
+        cache.pop(key, None)
+
+
+class cached_field():
+    """
+    decorator for a read-only property computed once per instance
+
+    Parameters
+    ----------
+    depends : strings, names of the inputs and cached fields the value is
+              computed from
+    axis : int, axis of the profiles in the value, used by subset. None if
+           the value can not be sliced to a part of the profiles
+    """
+
+    def __init__(self, *depends, axis = None):
+        self.depends = depends
+        self.axis    = axis
+
+    def __call__(self, func):
+        self.func    = func
+        self.__doc__ = func.__doc__
+        return self
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype = None):
+        if obj is None:
+            return self
+
+        cache = _cache(obj)
+        if self.name not in cache:
+            cache[self.name] = _freeze(self.func(obj))
+
+        return cache[self.name]
+
+
+class field_input():
+    """
+    attribute which invalidates all dependent cached fields when assigned
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype = None):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+        invalidate(obj, self.name)
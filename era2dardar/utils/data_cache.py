@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+In-memory cache of arrays read from a granule, e.g. DARDAR SDS or Cloudsat
+variables. Arrays are kept until the total size exceeds max_size, then the
+least recently used ones are dropped.
+
+@author: inderpreet
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+
+class data_cache():
+    """
+    least recently used cache of np.arrays with an optional size limit
+    """
+
+    def __init__(self, max_size = None):
+        """
+        Parameters
+        ----------
+        max_size : int, maximum size of the cached arrays in bytes,
+                   None for no limit, 0 to disable caching
+
+        Returns
+        -------
+        None.
+
+        """
+        self.max_size = max_size
+        self.data     = OrderedDict()
+        self.nbytes   = 0
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key):
+        """
+        cached array for key, None if not cached
+        """
+        if key not in self.data:
+            return None
+
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def put(self, key, value):
+        """
+        adds value to the cache, the array is set to read-only so that
+        changes in place by the caller do not modify the cache.
+        Arrays larger than max_size are not cached
+
+        Parameters
+        ----------
+        key : hashable, e.g. variable name
+        value : np.array
+
+        Returns
+        -------
+        value
+
+        """
+        value = np.asarray(value)
+        self.pop(key)
+
+        if self.max_size is not None and value.nbytes > self.max_size:
+            return value
+
+        value.flags.writeable = False
+        self.data[key] = value
+        self.nbytes   += value.nbytes
+
+        # drop least recently used arrays
+        while self.max_size is not None and self.nbytes > self.max_size:
+            _, old       = self.data.popitem(last = False)
+            self.nbytes -= old.nbytes
+
+        return value
+
+    def pop(self, key):
+        """
+        removes key from the cache
+        """
+        value = self.data.pop(key, None)
+        if value is not None:
+            self.nbytes -= value.nbytes
+        return value
+
+    def clear(self):
+        """
+        removes all arrays from the cache
+        """
+        self.data.clear()
+        self.nbytes = 0
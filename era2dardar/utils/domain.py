@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+ERA5 domains of DARDAR/Cloudsat scenes.
+
+A domain is [lat1, lat2, lon1, lon2] with longitudes in -180 to 180.
+Scenes crossing the antimeridian get two boxes, east and west of 180 deg,
+which are kept as two lazily opened datasets with continuous longitudes
+from lon1 to lon2 + 360, see stitch_lon, and joined when a window of the
+fields is read, see read_window.
+
+@author: inderpreet
+"""
+
+import numpy as np
+
+
+def scene_domain(lat, lon, pad = 2):
+    """
+    domain containing the scene with a margin of pad degrees,
+    limits are rounded to full degrees
+
+    Parameters
+    ----------
+    lat : np.array, latitudes of the scene [deg]
+    lon : np.array, longitudes of the scene in -180 to 180 [deg]
+    pad : float, margin around the scene [deg]
+
+    Returns
+    -------
+    domain : [lat1, lat2, lon1, lon2], or list of two such boxes, east and
+             west of the antimeridian, if the scene crosses it
+
+    """
+    lat     = np.asarray(lat)
+    lon     = np.asarray(lon)
+
+    lat1    = max(float(np.around(lat.min() - pad)), -90.0)
+    lat2    = min(float(np.around(lat.max() + pad)),  90.0)
+
+    # scenes crossing the antimeridian are shorter in 0 to 360
+    lon360  = lon % 360
+    if lon360.max() - lon360.min() < lon.max() - lon.min():
+        lon = lon360
+
+    lon1    = float(np.around(lon.min() - pad))
+    lon2    = float(np.around(lon.max() + pad))
+
+    if lon2 - lon1 >= 360:
+        return [lat1, lat2, -180.0, 180.0]
+
+    # lon1 in -180 to 180
+    if lon1 >= 180:
+        lon1, lon2 = lon1 - 360, lon2 - 360
+    if lon1 < -180:
+        lon1, lon2 = lon1 + 360, lon2 + 360
+
+    if lon2 <= 180:
+        return [lat1, lat2, lon1, lon2]
+
+    return [[lat1, lat2, lon1, 180.0], [lat1, lat2, -180.0, lon2 - 360]]
+
+
+def boxes(domain):
+    """
+    list of the boxes of a domain
+
+    Parameters
+    ----------
+    domain : None, [lat1, lat2, lon1, lon2] or list of such boxes
+
+    Returns
+    -------
+    list of boxes, [None] for global data
+
+    """
+    if domain is None:
+        return [None]
+    if np.ndim(domain) == 1:
+        return [domain]
+    return list(domain)
+
+
+def stitch_lon(datasets):
+    """
+    ERA5 datasets of boxes east and west of the antimeridian with continuous
+    longitudes. Longitudes of the western box are shifted by 360 deg, e.g. 
+    170 to 200. The boxes are not concatenated, which would read the fields,
+    but kept as separate lazy datasets, see stitched_lon and read_window
+
+    Parameters
+    ----------
+    datasets : list of one or two xarray.Dataset
+
+    Returns
+    -------
+    list of xarray.Dataset in order of longitude
+
+    """
+    if len(datasets) == 1:
+        return list(datasets)
+
+    east, west = sorted(datasets,
+                        key = lambda ds: -ds['longitude'].data.min())
+
+    west  = west.assign_coords(longitude = west['longitude'] + 360)
+
+    # 180 deg is contained in both boxes
+    keep  = west['longitude'].data > east['longitude'].data.max()
+    west  = west.isel(longitude = keep)
+
+    return [east, west]
+
+
+def stitched_lon(boxes):
+    """
+    longitudes of the boxes from stitch_lon joined together
+
+    Parameters
+    ----------
+    boxes : list of xarray.Dataset, see stitch_lon
+
+    Returns
+    -------
+    np.array
+
+    """
+    return np.concatenate([box['longitude'].data for box in boxes])
+
+
+def read_window(boxes, shortnames, latitude, longitude, **indexers):
+    """
+    reads the fields of shortnames in a window of the boxes from stitch_lon,
+    each box is read only in its part of the window
+
+    Parameters
+    ----------
+    boxes : list of xarray.Dataset, see stitch_lon
+    shortnames : list of ERA5 shortnames
+    latitude : slice or np.array of latitude indices
+    longitude : slice or np.array of increasing indices of stitched_lon
+    indexers : other indices of the fields, e.g. time = 0
+
+    Returns
+    -------
+    list of np.arrays, one for each shortname
+
+    """
+    if len(boxes) == 1:
+        era = boxes[0][list(shortnames)].isel(latitude = latitude,
+                                              longitude = longitude,
+                                              **indexers)
+        return [era[shortname].values for shortname in shortnames]
+
+    index  = np.arange(stitched_lon(boxes).size)[longitude]
+
+    parts  = []
+    start  = 0
+    for box in boxes:
+        size  = box['longitude'].size
+        local = index[(index >= start) & (index < start + size)] - start
+        start += size
+        if local.size == 0:
+            continue
+        
+        # contiguous indices are read as a slice
+        if local[-1] - local[0] + 1 == local.size:
+            local = slice(local[0], local[-1] + 1)
+            
+        era = box[list(shortnames)].isel(latitude = latitude,
+                                         longitude = local, **indexers)
+        parts.append(era)
+
+    if not parts:
+        parts = [boxes[0][list(shortnames)].isel(latitude = latitude,
+                                                 longitude = slice(0, 0),
+                                                 **indexers)]
+
+    return [np.concatenate([era[shortname].values for era in parts],
+                           axis = parts[0][shortname].get_axis_num("longitude"))
+            for shortname in shortnames]
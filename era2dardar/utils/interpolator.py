@@ -10,9 +10,10 @@ Created on Wed Dec  2 11:09:54 2020
 @author: inderpreet
 """
 
+import numpy as np
 from scipy.interpolate import RegularGridInterpolator, interpn
 
-def interpolator(points, A, method):
+def interpolator(points, A, method, dtype = None):
         """
         interface to scipy nD linear interpolator
         All dimensions should be in ascending order
@@ -23,12 +24,17 @@ def interpolator(points, A, method):
         A : field values to be interpolated from, dimension PxNxM
         
         method : "linear", "nearest"
+        dtype : dtype of the field values, e.g. np.float32,
+                None keeps the dtype of A
 
         Returns
         -------
         interpolator function
 
         """
+        if dtype is not None:
+            A = np.asarray(A).astype(dtype, copy = False)
+
         return (RegularGridInterpolator(points, A, 
                                         bounds_error = False, method = method, 
                                         fill_value = None))
@@ -11,15 +11,47 @@ from era2dardar.utils.ellipsoidradii import ellipsoidradii
 from typhon import constants
 from era2dardar.utils.pos2g import pos2g
 from era2dardar.utils.alt2pressure import alt2pres, pres2alt
-from scipy.interpolate import interp1d
 
 
 
 def shift2refpoint( p, z, p0, z0 ):
+    """
+    shifts altitudes z to pass through the reference point (p0, z0),
+    z is linearly interpolated in log(p) at p0.
+    
+    Parameters
+    ----------
+    p : np.array, pressure [Pa], dimension [p]
+    z : np.array, altitudes [m], dimension [p] or [p, profiles]
+    p0 : scalar or np.array [profiles], pressure of reference point [Pa]
+    z0 : scalar or np.array [profiles], altitude of reference point [m]
+
+    Returns
+    -------
+    z, np.array, shifted altitudes with dimensions of input z
+    """
+    
+    x       = np.log(p)
+    z2      = z.reshape(len(p), -1)
+    
+    # same steps as scipy interp1d "linear", for all profiles at once
+    order   = np.argsort(x, kind = "mergesort")
+    x       = x[order]
+    z2      = z2[order]
+    
+    x0      = np.broadcast_to(np.log(p0), z2.shape[1:])
+    cols    = np.arange(z2.shape[1])
     
-    f = interp1d(np.log(p), z, kind = "linear")
+    hi      = np.clip(np.searchsorted(x, x0), 1, len(x) - 1)
+    lo      = hi - 1
     
-    z = z - (f(np.log(p0))  - z0 )
+    slope   = (z2[hi, cols] - z2[lo, cols]) / (x[hi] - x[lo])
+    zref    = slope * (x0 - x[lo]) + z2[lo, cols]
+    
+    if z.ndim == 1:
+        zref = zref[0]
+    
+    z = z - (zref  - z0 )
 
     return z
 
@@ -46,16 +78,23 @@ def pt2z(p, t, h2o, p0, z0, lat = 45, z_acc = -1):
     are repeated until the max change of the altitudes is below *z_acc*. If
     z_acc<0, the calculations are run twice, which should give an accuracy
     better than 1 m.
+    
+    All profiles are computed at once if t and h2o are given as 
+    [p, profiles] arrays, with p0, z0 and lat per profile. The layer 
+    thicknesses are summed with cumsum along the pressure axis, in the same 
+    order as the layer by layer loop of atmlab. With the default z_acc, 
+    results agree with the single profile calculation to within 1e-6 m,
+    see scripts/check_pt2z.py.
 
 
     Parameters
     ----------
-    p : np.array containing pressure values [Pa]
-    t : np.array containing temperature [K]
+    p : np.array containing pressure values [Pa], dimension [p]
+    t : np.array containing temperature [K], dimension [p] or [p, profiles]
     h2o : np.array or a scalar, Water vapour [VMR]. 
-    p0 : Pressure of reference point [Pa]
-    z0 : Altitude of reference point [m]
-    lat : Latitude [deg]. Default is 45.
+    p0 : Pressure of reference point [Pa], scalar or [profiles]
+    z0 : Altitude of reference point [m], scalar or [profiles]
+    lat : Latitude [deg]. Default is 45. scalar or [profiles]
     z_acc : Accuracy for z. Default is -1.
 
     Raises
@@ -66,12 +105,14 @@ def pt2z(p, t, h2o, p0, z0, lat = 45, z_acc = -1):
 
     Returns
     -------
-    z, np.array, geometric altitudes fulfilling hydrostatic equilibrium
+    z, np.array, geometric altitudes fulfilling hydrostatic equilibrium, 
+    same dimensions as t
     """
     
     
     
-    
+    p = np.asarray(p)
+    t = np.asarray(t)
     n = len(p)
     
     if len(t) != n:                                                      
@@ -84,10 +125,13 @@ def pt2z(p, t, h2o, p0, z0, lat = 45, z_acc = -1):
     if  len(h2o) != n:                          
             raise ValueError('The length of *h2o* must be 1 or match *p*.')
 
-    if p0 > p[0]  or  p0 < p[-1]:
+    if np.any(p0 > p[0])  or  np.any(p0 < p[-1]):
       raise ValueError('Reference point (p0) can not be outside range of *p*.')
                                                                     
-
+    # profiles along second dimension    
+    shape = t.shape
+    t     = t.reshape(n, -1)
+    h2o   = np.asarray(h2o).reshape(n, -1)
     
     ellipsoid = ellipsoidmodels('wgs84')
     
@@ -95,10 +139,12 @@ def pt2z(p, t, h2o, p0, z0, lat = 45, z_acc = -1):
     # make rough estimate of z
     
     z = pres2alt(p)
-    z =shift2refpoint(p, z, p0, z0)
+    z = np.tile(z[:, np.newaxis], (1, t.shape[1]))
+    z = shift2refpoint(p, z, p0, z0)
     
     # set Earth radius and g at z=0
     
+    lat = np.asarray(lat)
     re = ellipsoidradii(ellipsoid, lat)
     g0 = pos2g(lat, 0)
     
@@ -110,7 +156,10 @@ def pt2z(p, t, h2o, p0, z0, lat = 45, z_acc = -1):
 
     k  = 1-mw/md    # 1 - eps
     rd = 1e3 * r / md  # gas constant for 1 kg of dry air
-        
+    
+    # log pressure ratio of each layer
+    
+    dlogp = np.log( p[:-1] / p[1:] )[:, np.newaxis]
     
     #How to end iterations
     
@@ -125,26 +174,24 @@ def pt2z(p, t, h2o, p0, z0, lat = 45, z_acc = -1):
         
           g = z2g( re, g0, z )
 
-          for i in range(n-1):
-
-        
-                gp  = ( g[i] + g[i+1] ) / 2;
+          gp  = ( g[:-1] + g[1:] ) / 2
         
-                #Calculate average water VMR (= average e/p)
-                hm  = (h2o[i]+h2o[i+1]) / 2;
+          #Calculate average water VMR (= average e/p)
+          hm  = ( h2o[:-1] + h2o[1:] ) / 2
         
-                #The virtual temperature (no liquid water)
-                tv = (t[i]+t[i+1]) / ( 2 * (1-hm*k) )  # 3.16 in Wallace&Hobbs
+          #The virtual temperature (no liquid water)
+          tv  = ( t[:-1] + t[1:] ) / ( 2 * (1-hm*k) )  # 3.16 in Wallace&Hobbs
         
-                #The change in vertical altitude from i to i+1 
-                dz = rd * (tv/gp) * np.log( p[i]/p[i+1] )
-                z[i+1] = z[i] + dz
-            
+          #The change in vertical altitude from i to i+1 
+          dz  = rd * (tv/gp) * dlogp
+          
+          #Sum layers upwards from the first level
+          z   = np.cumsum( np.concatenate([z[:1], dz]), axis = 0 )
         
           # Match the altitude of the reference point
           z = shift2refpoint( p, z, p0, z0 );
         
-          if (z_acc >= 0) & (max(abs(z-zold)) < z_acc):
+          if (z_acc >= 0) & (np.max(abs(z-zold)) < z_acc):
             break
         
-    return z    
+    return z.reshape(shape)
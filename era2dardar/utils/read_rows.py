@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+reads selected profiles (rows) of a HDF4 SDS with hyperslab reads,
+only the contiguous row ranges containing the selection are read from file
+
+@author: inderpreet
+"""
+
+import numpy as np
+
+
+def index2runs(index):
+    """
+    splits sorted row indices into contiguous ranges
+
+    Parameters
+    ----------
+    index : np.array of strictly increasing row indices
+
+    Returns
+    -------
+    starts : np.array, first row of each range
+    counts : np.array, number of rows in each range
+
+    """
+    index   = np.asarray(index)
+    if index.size == 0:
+        return np.array([], dtype = int), np.array([], dtype = int)
+
+    breaks  = np.flatnonzero(np.diff(index) != 1) + 1
+    starts  = index[np.concatenate(([0], breaks))]
+    ends    = index[np.concatenate((breaks - 1, [index.size - 1]))] + 1
+
+    return starts, ends - starts
+
+
+def read_rows(sds_obj, index = None):
+    """
+    reads the rows index along the first dimension of a pyhdf SDS
+
+    Parameters
+    ----------
+    sds_obj : pyhdf.SD.SDS instance
+    index : np.array of strictly increasing row indices, if None all rows are read
+
+    Returns
+    -------
+    np.array containing the selected rows
+
+    """
+    if index is None:
+        return sds_obj.get()
+
+    dims    = sds_obj.info()[2]
+    dims    = [int(d) for d in np.atleast_1d(dims)]
+
+    starts, counts = index2runs(index)
+
+    if starts.size == 0:
+        # read one row to get dtype and trailing dimensions
+        start   = [0] * len(dims)
+        count   = [1] + dims[1:]
+        return sds_obj.get(start = start, count = count)[:0]
+
+    data    = []
+    for r0, n in zip(starts, counts):
+        start   = [int(r0)] + [0] * (len(dims) - 1)
+        count   = [int(n)] + dims[1:]
+        data.append(sds_obj.get(start = start, count = count))
+
+    data    = np.concatenate(data, axis = 0)
+
+    return data
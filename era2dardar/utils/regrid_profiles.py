@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+batched linear interpolation of many profiles, used to map DARDAR/Cloudsat
+profiles from their altitudes to a pressure grid
+
+@author: inderpreet
+"""
+
+import numpy as np
+
+
+def interp_profiles(x, y, x_new, dtype = None):
+    """
+    linear interpolation of all profiles in one call. For each profile i
+    the result equals
+    scipy.interpolate.interp1d(x[i], y[i], fill_value = "extrapolate")(x_new[i])
+
+    Parameters
+    ----------
+    x : np.array [profiles, n], monotonic (increasing or decreasing)
+        along each profile
+    y : np.array [profiles, n] or [n], values at x
+    x_new : np.array [profiles, m] or [m], locations to interpolate to
+    dtype : dtype of the values and the result, e.g. np.float32,
+            the locations are always handled in float64
+
+    Returns
+    -------
+    y_new : np.array [profiles, m]
+
+    """
+    x       = np.asarray(x, dtype = np.float64)
+    n_prof, n = x.shape
+    y       = np.broadcast_to(y, x.shape)
+    x_new   = np.broadcast_to(x_new, (n_prof, np.shape(x_new)[-1]))
+
+    # profiles with decreasing x are flipped
+    flip    = x[:, 0] > x[:, -1]
+    if np.any(flip):
+        x   = np.where(flip[:, np.newaxis], x[:, ::-1], x)
+        y   = np.where(flip[:, np.newaxis], y[:, ::-1], y)
+
+    # one searchsorted for all profiles, each profile is shifted by an offset
+    # larger than the range of values, so that the flattened x is sorted
+    lo_x    = min(x.min(), x_new.min())
+    span    = max(x.max(), x_new.max()) - lo_x + 1
+    offset  = (np.arange(n_prof) * span)[:, np.newaxis] - lo_x
+
+    ind     = np.searchsorted((x + offset).ravel(), (x_new + offset).ravel())
+    ind     = ind.reshape(x_new.shape) - (np.arange(n_prof) * n)[:, np.newaxis]
+
+    hi      = np.clip(ind, 1, n - 1)
+    lo      = hi - 1
+
+    x_lo    = np.take_along_axis(x, lo, axis = 1)
+    x_hi    = np.take_along_axis(x, hi, axis = 1)
+    y_lo    = np.take_along_axis(y, lo, axis = 1)
+    y_hi    = np.take_along_axis(y, hi, axis = 1)
+
+    if dtype is not None:
+        # weights in float64, values in dtype
+        w       = ((x_new - x_lo) / (x_hi - x_lo)).astype(dtype)
+        y_lo    = y_lo.astype(dtype, copy = False)
+        y_hi    = y_hi.astype(dtype, copy = False)
+        return y_lo * (1 - w) + y_hi * w
+
+    slope   = (y_hi - y_lo) / (x_hi - x_lo)
+    y_new   = slope * (x_new - x_lo) + y_lo
+
+    return y_new
+
+
+def height2logp(z_field, p_grid, height):
+    """
+    log pressure at the altitudes of DARDAR/Cloudsat bins for each profile,
+    from the altitudes z_field of the pressure grid
+
+    Parameters
+    ----------
+    z_field : np.array [p, profiles], altitudes of p_grid for each profile [m]
+    p_grid : np.array [p], pressure grid [Pa]
+    height : np.array [bins] or [profiles, bins], altitudes of the data [m]
+
+    Returns
+    -------
+    p_d : np.array [profiles, bins], log of pressure [Pa] at height
+
+    """
+    return interp_profiles(np.transpose(z_field), np.log(p_grid), height)
+
+
+def resample_profiles(p_d, p_grid, data, dtype = None):
+    """
+    linearly interpolates profiles in log(p) to p_grid, values outside the 
+    profiles are extrapolated
+
+    Parameters
+    ----------
+    p_d : np.array [profiles, bins], log of pressure [Pa] of the data, 
+          see height2logp
+    p_grid : np.array [p], pressure grid [Pa]
+    data : np.array [profiles, bins], e.g. reflectivities
+    dtype : dtype of the result, e.g. np.float32, see interp_profiles
+
+    Returns
+    -------
+    np.array [p, profiles] containing data on p_grid
+
+    """
+    grid    = interp_profiles(p_d, data, np.log(p_grid), dtype)
+
+    return grid.T
+
+
+def regrid_profiles(z_field, p_grid, height, data, dtype = None):
+    """
+    resamples profiles defined at altitudes to the pressure grid p_grid.
+    DARDAR/Cloudsat heights are first converted to log(p) with z_field,
+    then the profiles are linearly interpolated in log(p) to p_grid,
+    values outside the profiles are extrapolated
+
+    Parameters
+    ----------
+    z_field : np.array [p, profiles], altitudes of p_grid for each profile [m]
+    p_grid : np.array [p], pressure grid [Pa]
+    height : np.array [bins] or [profiles, bins], altitudes of the data [m]
+    data : np.array [profiles, bins], e.g. reflectivities
+    dtype : dtype of the result, e.g. np.float32, see interp_profiles
+
+    Returns
+    -------
+    np.array [p, profiles] containing data on p_grid
+
+    """
+    p_d     = height2logp(z_field, p_grid, height)
+
+    return resample_profiles(p_d, p_grid, data, dtype)
@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+Interpolation plan for one DARDAR/locations scene on the ERA5 grids.
+
+The bracket indices and weights of the track on the ERA5 latitude, longitude
+and log-pressure axes are searched once, and every ERA5 field defined on the
+same grids is then interpolated by a weighted gather of its neighbours.
+Results follow scipy.RegularGridInterpolator with bounds_error = False and
+fill_value = None, i.e. points outside the grid are linearly extrapolated.
+Levels of the plan beyond the levels of a field are virtual levels, e.g. the
+extra 1150 hPa level of ERA5p. They are filled from the last level of the
+field or from given values, without copying the field.
+Global longitude grids are treated as periodic, the neighbours across the
+end of the grid are found by index arithmetic without copying the fields.
+Optionally, fields of several hours are interpolated linearly in time to the
+time of each track point, in the same gather as the space interpolation.
+Tracks made of distant parts, e.g. the nodes of an orbit, are split into
+pieces, so that the fields are read in one small window per piece.
+
+@author: inderpreet
+"""
+
+import copy
+import numpy as np
+
+
+def is_uniform(grid):
+    """
+    True if the grid points are equally spaced, e.g. ERA5 lat/lon grids
+    """
+    grid = np.asarray(grid, dtype = np.float64)
+    if grid.size < 3:
+        return grid.size == 2
+    step = np.diff(grid)
+    return bool(np.allclose(step, step[0], rtol = 1e-6, atol = 0))
+
+
+def bracket(grid, x):
+    """
+    lower bracket index and normalised distance of x on an ascending grid.
+    On uniform grids the index is computed arithmetically, otherwise by a 
+    binary search
+
+    Parameters
+    ----------
+    grid : np.array, ascending grid points
+    x : np.array, locations to be bracketed
+
+    Returns
+    -------
+    i : np.array, index of lower grid point, clipped to [0, len(grid) - 2]
+    w : np.array, normalised distance of x from grid[i],
+        values outside [0, 1] are extrapolated
+
+    """
+    grid = np.asarray(grid, dtype = np.float64)
+    x    = np.asarray(x, dtype = np.float64)
+
+    # points on the grid take the lower cell, as with searchsorted
+    if is_uniform(grid):
+        step = (grid[-1] - grid[0]) / (grid.size - 1)
+        i    = np.ceil((x - grid[0]) / step).astype(np.intp) - 1
+        
+        # the rounded quotient can be one cell off for points on or next 
+        # to grid points, one step against the grid corrects it
+        i    = np.clip(i, -1, grid.size - 1)
+        i    = i - ((i >= 0) & (x <= grid[np.maximum(i, 0)]))
+        i    = i + ((i < grid.size - 1) 
+                    & (x > grid[np.minimum(i + 1, grid.size - 1)]))
+    else:
+        i    = np.searchsorted(grid, x) - 1
+    i    = np.clip(i, 0, grid.size - 2)
+
+    w    = (x - grid[i]) / (grid[i + 1] - grid[i])
+
+    return i, w
+
+
+def bracket_periodic(grid, x, period = 360.0):
+    """
+    lower and upper bracket indices and normalised distance of x on an
+    ascending periodic grid, e.g. global longitudes. The upper neighbour of
+    the last grid point is the first grid point
+
+    Parameters
+    ----------
+    grid : np.array, ascending grid points covering one period, the last
+           point may repeat the first one, e.g. -180 to 180
+    x : np.array, locations to be bracketed, in any period
+    period : float, period of the grid
+
+    Returns
+    -------
+    i : np.array, index of lower grid point
+    j : np.array, index of upper grid point
+    w : np.array, normalised distance of x from grid[i], in [0, 1]
+
+    """
+    grid = np.asarray(grid, dtype = np.float64)
+    x    = np.asarray(x, dtype = np.float64)
+
+    # a repeated end point is not a separate grid point
+    n    = grid.size
+    if np.isclose(grid[-1] - grid[0], period):
+        n = n - 1
+
+    # grid with the first point appended one period later
+    ext  = np.append(grid[:n], grid[0] + period)
+    x    = (x - grid[0]) % period + grid[0]
+
+    i    = np.searchsorted(ext, x) - 1
+    i    = np.clip(i, 0, n - 1)
+
+    w    = (x - ext[i]) / (ext[i + 1] - ext[i])
+
+    return i, (i + 1) % n, w
+
+
+def is_periodic(grid, period = 360.0):
+    """
+    True if the ascending grid covers a full period, with or without the 
+    repeated end point
+    """
+    grid = np.asarray(grid, dtype = np.float64)
+    if grid.size < 2:
+        return False
+    step = grid[1] - grid[0]
+    return (np.isclose(grid[-1] - grid[0], period) 
+            or np.isclose(grid[-1] - grid[0] + step, period))
+
+
+def nearest(i, w, j = None):
+    """
+    nearest grid point from bracket index and weight, ties go to lower index
+    as in scipy.RegularGridInterpolator. j is the upper bracket index,
+    default is i + 1
+    """
+    if j is None:
+        j = i + 1
+    return np.where(w <= 0.5, i, j)
+
+
+class ScenePlan():
+    """
+    bracket indices and weights of a track on ERA5 lat/lon grids and
+    optionally on ERA5 log-pressure levels.
+    The plan is built once per scene and applied to every field
+    """
+
+    def __init__(self, lat, lon, lat_d, lon_d, level = None, p_grid = None,
+                 periodic = False, time = None, time_d = None, dtype = None):
+        """
+        Parameters
+        ----------
+        lat : np.array, ERA5 latitudes in ascending order
+        lon : np.array, ERA5 longitudes in ascending order
+        lat_d : np.array, latitudes of the track
+        lon_d : np.array, longitudes of the track, in the same range as lon,
+                any range if periodic
+        level : np.array, ERA5 pressure levels [hPa], None for surface fields
+        p_grid : np.array, pressure grid for interpolation [hPa],
+                 if None, ERA5 levels are used
+        periodic : if True, lon is a global grid and wraps around
+        time : np.array, times of the ERA5 hours [s], in ascending order.
+               If given, fields have a leading time dimension
+        time_d : np.array, times of the track points [s], times outside
+                 the ERA5 hours take the first or last hour
+        dtype : dtype of the weights and of the fields read for the plan,
+                e.g. np.float32, None keeps the dtype of the fields and
+                computes in float64
+
+        Returns
+        -------
+        None.
+
+        """
+        self.ilat, self.wlat = bracket(lat, lat_d)
+        self.periodic        = periodic
+        self.nlon            = np.size(lon)
+        if periodic:
+            self.ilon, self.jlon, self.wlon = bracket_periodic(lon, lon_d)
+            if np.isclose(lon[-1] - lon[0], 360.0):
+                self.nlon = self.nlon - 1
+        else:
+            self.ilon, self.wlon = bracket(lon, lon_d)
+            self.jlon = self.ilon + 1
+
+        self.itime = None
+        if time is not None and np.size(time) > 1:
+            self.itime, self.wtime = bracket(time, time_d)
+            self.wtime = np.clip(self.wtime, 0, 1)
+
+        # nearest grid cells, see nearest_cells
+        self.cells = None
+
+        self.dtype = dtype
+        if dtype is not None:
+            self.wlat = self.wlat.astype(dtype)
+            self.wlon = self.wlon.astype(dtype)
+            if self.itime is not None:
+                self.wtime = self.wtime.astype(dtype)
+
+        self.level = level
+        if level is not None:
+            self.set_levels(p_grid)
+
+    def set_levels(self, p_grid = None):
+        """
+        brackets of log(p_grid) on the log of ERA5 levels
+
+        Parameters
+        ----------
+        p_grid : np.array, pressure grid [hPa], if None ERA5 levels are used
+
+        Returns
+        -------
+        None.
+
+        """
+        level = np.log(self.level)
+        if p_grid is None:
+            p = level
+        else:
+            p = np.log(p_grid)
+
+        self.ilev, self.wlev = bracket(level, p)
+        if self.dtype is not None:
+            self.wlev = self.wlev.astype(self.dtype)
+
+    def regrid(self, p_grid = None):
+        """
+        plan for another pressure grid sharing the lat/lon brackets
+
+        Parameters
+        ----------
+        p_grid : np.array, pressure grid [hPa], if None ERA5 levels are used
+
+        Returns
+        -------
+        ScenePlan instance
+
+        """
+        if self.level is None:
+            raise Exception("plan has no pressure levels")
+
+        plan = copy.copy(self)
+        plan.set_levels(p_grid)
+
+        return plan
+
+    def window(self):
+        """
+        time, latitude and longitude indices of the grid points used by the 
+        plan, i.e. the bracketing neighbours of all track points, and the 
+        plan on this window. Fields can be read only in the window, e.g. from 
+        lazily opened files. For periodic grids the window may wrap around
+
+        Returns
+        -------
+        time : slice of time indices, None if the plan has no times
+        lat : slice of latitude indices
+        lon : slice of longitude indices, or np.array of indices if the 
+              window wraps around the end of a periodic grid
+        plan : ScenePlan instance for fields subset to the window
+
+        """
+        plan = copy.copy(self)
+
+        time = None
+        if self.itime is not None:
+            time = slice(0, 0)
+            if self.size > 0:
+                time = slice(self.itime.min(), self.itime.max() + 2)
+                plan.itime = self.itime - time.start
+
+        if self.size == 0:
+            return time, slice(0, 0), slice(0, 0), plan
+
+        lat0 = self.ilat.min()
+        lat  = slice(lat0, self.ilat.max() + 2)
+
+        used = np.unique(np.concatenate([self.ilon, self.jlon]))
+        if self.periodic:
+            # the window starts after the largest gap between used columns
+            gaps  = np.diff(np.append(used, used[0] + self.nlon))
+            k     = np.argmax(gaps)
+            lon0  = used[(k + 1) % used.size]
+            size  = self.nlon - gaps[k] + 1
+        else:
+            lon0  = used[0]
+            size  = used[-1] - lon0 + 1
+
+        if lon0 + size <= self.nlon:
+            lon = slice(lon0, lon0 + size)
+        else:
+            lon = (lon0 + np.arange(size)) % self.nlon
+
+        plan.ilat     = self.ilat - lat0
+        plan.ilon     = (self.ilon - lon0) % self.nlon
+        plan.jlon     = (self.jlon - lon0) % self.nlon
+        plan.nlon     = size
+        plan.periodic = False
+
+        # nearest cells of the plan, shifted to the window
+        t, j, l    = self.nearest_cells()
+        if t is not None:
+            t = t - time.start
+        plan.cells = (t, j - lat0, (l - lon0) % self.nlon)
+
+        return time, lat, lon, plan
+
+    def nearest_cells(self):
+        """
+        indices of the nearest grid cell of each track point, found once
+        and reused by all fields interpolated with method "nearest"
+
+        Returns
+        -------
+        t : np.array of time indices, None if the plan has no times
+        j : np.array of latitude indices
+        l : np.array of longitude indices
+
+        """
+        if self.cells is None:
+            t = None
+            if self.itime is not None:
+                t = nearest(self.itime, self.wtime)
+            self.cells = (t, nearest(self.ilat, self.wlat),
+                          nearest(self.ilon, self.wlon, self.jlon))
+
+        return self.cells
+
+    def take(self, rows):
+        """
+        plan for a part of the track, sharing the grids and levels
+
+        Parameters
+        ----------
+        rows : slice or np.array of track points
+
+        Returns
+        -------
+        ScenePlan instance
+
+        """
+        plan = copy.copy(self)
+        for name in ["ilat", "wlat", "ilon", "jlon", "wlon"]:
+            setattr(plan, name, getattr(self, name)[rows])
+
+        if self.itime is not None:
+            plan.itime = self.itime[rows]
+            plan.wtime = self.wtime[rows]
+
+        if self.cells is not None:
+            plan.cells = tuple(None if c is None else c[rows] 
+                               for c in self.cells)
+
+        return plan
+
+    def pieces(self, gap = 4, max_pieces = 16):
+        """
+        contiguous parts of the track, split where consecutive track points
+        are more than gap grid cells apart, e.g. between the ascending and 
+        descending nodes of an orbit. The window of each part is much 
+        smaller than the window of the whole track
+
+        Parameters
+        ----------
+        gap : int, distance in grid cells at which the track is split
+        max_pieces : int, tracks with more parts, e.g. scattered locations,
+                     are not split
+
+        Returns
+        -------
+        list of slices of track points
+
+        """
+        if self.size < 2:
+            return [slice(0, self.size)]
+
+        dlat = np.abs(np.diff(self.ilat))
+        dlon = np.abs(np.diff(self.ilon))
+        if self.periodic:
+            dlon = np.minimum(dlon, self.nlon - dlon)
+
+        breaks = np.flatnonzero((dlat > gap) | (dlon > gap)) + 1
+        if breaks.size == 0 or breaks.size >= max_pieces:
+            return [slice(0, self.size)]
+
+        edges = np.concatenate([[0], breaks, [self.size]])
+        return [slice(i, j) for i, j in zip(edges[:-1], edges[1:])]
+
+    @property
+    def size(self):
+        """
+        number of track points
+        """
+        return self.ilat.size
+
+    def horizontal(self, field, method = "linear", levels = None, 
+                   extra = None):
+        """
+        interpolates field to the track along latitude and longitude,
+        and along time if the plan has times
+
+        Parameters
+        ----------
+        field : np.array, dimensions [lat, lon] or [level, lat, lon],
+                with a leading time dimension if the plan has times,
+                trailing dimensions, e.g. stacked variables, are kept
+        method : "linear", "nearest"; default is "linear"
+        levels : np.array of level indices to be gathered, all if None.
+                 Indices beyond the levels of field are virtual levels
+        extra : values at virtual levels, broadcast to the trailing 
+                dimensions. Where None or NaN, the last level of field 
+                is used
+
+        Returns
+        -------
+        np.array, dimensions [track] or [level, track]
+
+        """
+        ilat, ilon, jlon = self.ilat, self.ilon, self.jlon
+        itime  = self.itime
+        ntrail = field.ndim - 2 - (itime is not None)
+
+        virtual = None
+        if self.level is not None:
+            ntrail = ntrail - 1
+            nlevel = field.shape[0 if itime is None else 1]
+            if levels is None and (nlevel < self.level.size 
+                                   or itime is not None):
+                levels = np.arange(self.level.size)
+            if levels is not None:
+                levels  = np.asarray(levels)
+                virtual = levels >= nlevel
+                levels  = np.minimum(levels, nlevel - 1)
+
+        if self.level is None:
+            def gather(t, j, l):
+                if t is None:
+                    return field[j, l]
+                return field[t, j, l]
+        elif levels is not None:
+            k = levels[:, np.newaxis]
+            def gather(t, j, l):
+                if t is None:
+                    return field[k, j, l]
+                return field[t, k, j, l]
+        else:
+            def gather(t, j, l):
+                return field[:, j, l]
+
+        shape = (-1,) + (1,) * ntrail
+
+        if method == "nearest":
+            grid_t = gather(*self.nearest_cells())
+
+        elif method == "linear":
+            wlat, wlon = self.wlat.reshape(shape), self.wlon.reshape(shape)
+    
+            def space(t):
+                return (gather(t, ilat, ilon) * ((1 - wlat) * (1 - wlon))
+                        + gather(t, ilat, jlon) * ((1 - wlat) * wlon)
+                        + gather(t, ilat + 1, ilon) * (wlat * (1 - wlon))
+                        + gather(t, ilat + 1, jlon) * (wlat * wlon))
+
+            if itime is None:
+                grid_t = space(None)
+            else:
+                wtime  = self.wtime.reshape(shape)
+                grid_t = (space(itime) * (1 - wtime) 
+                          + space(itime + 1) * wtime)
+        else:
+            raise ValueError("method should be 'linear' or 'nearest'")
+
+        # virtual levels are copies of the last level unless values are given
+        if extra is not None and virtual is not None and virtual.any():
+            extra = np.asarray(extra)
+            grid_t[virtual] = np.where(np.isnan(extra), 
+                                       grid_t[virtual], extra)
+
+        return grid_t
+
+    def vertical(self, columns, method = "linear", levels = None, 
+                 logspace = False):
+        """
+        interpolates columns on ERA5 levels to the planned pressure grid,
+        linearly in log(p)
+
+        Parameters
+        ----------
+        columns : np.array, dimensions [level, track], trailing dimensions 
+                  are kept
+        method : "linear", "nearest"; default is "linear"
+        levels : np.array of the level indices contained in columns,
+                 all levels if None
+        logspace : if True, log(columns) is interpolated, e.g. for 
+                   volume mixing ratios. Columns should be positive
+
+        Returns
+        -------
+        np.array, dimensions [p, track]
+
+        """
+        ilev, wlev = self.ilev, self.wlev
+
+        if method == "nearest":
+            j = nearest(ilev, wlev)
+            if levels is not None:
+                j = np.searchsorted(levels, j)
+            return columns[j]
+
+        lo, hi = ilev, ilev + 1
+        if levels is not None:
+            lo, hi = np.searchsorted(levels, lo), np.searchsorted(levels, hi)
+
+        wlev = wlev.reshape((-1,) + (1,) * (columns.ndim - 1))
+
+        if logspace:
+            return np.exp(np.log(columns[lo]) * (1 - wlev) 
+                          + np.log(columns[hi]) * wlev)
+
+        return columns[lo] * (1 - wlev) + columns[hi] * wlev
+
+    def interpolate(self, field, method = "linear", extra = None, 
+                    logspace = False):
+        """
+        interpolates field to the track, and to the planned pressure grid
+        for pressure level fields
+
+        Parameters
+        ----------
+        field : np.array, dimensions [lat, lon] or [level, lat, lon],
+                with a leading time dimension if the plan has times,
+                trailing dimensions, e.g. stacked variables, are kept
+        method : "linear", "nearest"; default is "linear"
+        extra : values at virtual levels, see horizontal
+        logspace : if True, the vertical interpolation is done on 
+                   log(field), see vertical
+
+        Returns
+        -------
+        np.array, dimensions [track] or [p, track]
+
+        """
+        if self.level is None:
+            return self.horizontal(field, method)
+
+        # only the levels bracketing the pressure grid are gathered
+        if method == "nearest":
+            levels = np.unique(nearest(self.ilev, self.wlev))
+        else:
+            levels = np.unique(np.concatenate([self.ilev, self.ilev + 1]))
+
+        columns = self.horizontal(field, method, levels, extra)
+
+        return self.vertical(columns, method, levels, logspace)
@@ -52,7 +52,7 @@ grid_t          = ERA_t.interpolate(dardar, p_grid)
 
 # pressure grid
 z_grid          = np.arange(-100, 25000, 250) 
-p_grid          = ERA_t.era["level"].data[3:] * 100 # [Pa]
+p_grid          = ERA_t.level[3:] * 100 # [Pa]
 #p_grid         = alt2pres(z_grid) 
 
 
@@ -24,6 +24,7 @@ import shutil
 import subprocess
 import zipfile
 from era2dardar.utils.add2zip import add2zip, check_in_zip
+from era2dardar.utils.domain import scene_domain
 
 
 def filename2date(filename):
@@ -110,25 +111,9 @@ def run_all_N0star(p_grid, zipfiles, latlims, zippath):
             lon          = dardar.longitude 
             lat          = dardar.latitude
             
-            lat1         = np.around(lat.min() - 2)
-            lat2         = np.around(lat.max() + 2)
-            
-            lon1         = np.around(lon.min() - 2)
-            lon2         = np.around(lon.max() + 2)
-    
-            if lon1 < -180:
-                lon1 = -180.0
-            if lon2 > 180:
-                lon2 = 180.0    
-      
-# when encountering prime meridian, download global data
-# keeps interpolation simple          
-            if lon1 == -180 or lon2 == 180:
-                lon1 = -180.
-                lon2 =  180.
-                
-# domain for which ERA5 data is downloaded           
-            domain  = [lat1, lat2, lon1, lon2]
+            # domain for which ERA5 data is downloaded, 
+            # two boxes if the scene crosses the antimeridian
+            domain  = scene_domain(lat, lon)
             
 
 # instantiate the atmdata class to get only N0star            
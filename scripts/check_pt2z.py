@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+regression check of pt2z for several profiles at once against the layer by
+layer calculation of single profiles, as translated from atmlab.
+Synthetic profiles with fixed and varying reference points are used,
+altitudes with the default z_acc should agree to within TOLERANCE.
+With z_acc >= 0 the results differ, as the single profile loop changes z 
+in place and stops after the first iteration, while pt2z iterates until 
+the change is below z_acc.
+
+@author: inderpreet
+"""
+
+import numpy as np
+from scipy.interpolate import interp1d
+from typhon import constants
+from era2dardar.utils.pt2z import pt2z, z2g
+from era2dardar.utils.ellipsoidmodels import ellipsoidmodels
+from era2dardar.utils.ellipsoidradii import ellipsoidradii
+from era2dardar.utils.pos2g import pos2g
+from era2dardar.utils.alt2pressure import alt2pres, pres2alt
+
+# maximum difference of altitudes [m]
+TOLERANCE = 1e-6
+
+
+def shift2refpoint_profile(p, z, p0, z0):
+
+    f = interp1d(np.log(p), z, kind = "linear")
+
+    z = z - (f(np.log(p0))  - z0 )
+
+    return z
+
+
+def pt2z_profile(p, t, h2o, p0, z0, lat = 45):
+    """
+    pt2z for a single profile with the default z_acc, layer by layer 
+    as in atmlab
+    """
+    n = len(p)
+
+    ellipsoid = ellipsoidmodels('wgs84')
+
+    z  = pres2alt(p)
+    z  = shift2refpoint_profile(p, z, p0, z0)
+
+    re = ellipsoidradii(ellipsoid, lat)
+    g0 = pos2g(lat, 0)
+
+    r   = constants.R
+    md  = 28.966
+    mw  = 18.016
+
+    k  = 1-mw/md    # 1 - eps
+    rd = 1e3 * r / md  # gas constant for 1 kg of dry air
+
+    for j in range(2):
+
+          g = z2g( re, g0, z )
+
+          for i in range(n-1):
+
+                gp  = ( g[i] + g[i+1] ) / 2
+                hm  = (h2o[i]+h2o[i+1]) / 2
+                tv = (t[i]+t[i+1]) / ( 2 * (1-hm*k) )
+                dz = rd * (tv/gp) * np.log( p[i]/p[i+1] )
+                z[i+1] = z[i] + dz
+
+          z = shift2refpoint_profile( p, z, p0, z0 )
+
+    return z
+
+
+def synthetic_profiles(p, nprofiles, seed = 0):
+    """
+    temperature [K] and water vapour [VMR] profiles, dimensions [p, profiles]
+    """
+    rng  = np.random.default_rng(seed)
+    z    = pres2alt(p)[:, np.newaxis]
+
+    t0   = 285 + 15 * rng.standard_normal(nprofiles)
+    t    = np.maximum(t0 - 6.5e-3 * z, 210) + rng.standard_normal(z.shape)
+    h2o  = 0.02 * np.exp(-z / 2000) * rng.uniform(0.2, 1, nprofiles)
+
+    return t, h2o
+
+
+if __name__ == "__main__":
+
+    p       = alt2pres(np.arange(-700, 20000, 250))
+    n       = 200
+    t, h2o  = synthetic_profiles(p, n)
+
+    rng     = np.random.default_rng(1)
+    lat     = rng.uniform(-65, 65, n)
+
+    cases   = {"fixed p0"   : (np.full(n, 1000e2), np.zeros(n)),
+               "varying p0" : (rng.uniform(700e2, 1030e2, n),
+                               rng.uniform(-50, 3000, n))}
+
+    for name, (p0, z0) in cases.items():
+        z    = pt2z(p, t, h2o, p0, z0, lat = lat)
+
+        zref = np.stack([pt2z_profile(p, t[:, i], h2o[:, i], p0[i], z0[i],
+                                      lat = lat[i])
+                         for i in range(n)], axis = 1)
+
+        diff = np.abs(z - zref).max()
+        print (name, "max difference [m]", diff)
+
+        if not diff <= TOLERANCE:
+            raise Exception("pt2z differs from single profiles by %g m"
+                            % diff)
@@ -22,6 +22,7 @@ import shutil
 import matplotlib.pyplot as plt
 
 from era2dardar.atmData import atmdata
+from era2dardar.utils.domain import scene_domain
 
 # pressure grid
 p_grid = alt2pres(np.arange(-700, 20000, 250))
@@ -50,25 +51,9 @@ print ("t_0, t_1", dardar.t_0, dardar.t_1)
 lon          = dardar.longitude 
 lat          = dardar.latitude
 
-lat1         = np.around(lat.min() - 2)
-lat2         = np.around(lat.max() + 2)
-
-lon1         = np.around(lon.min() - 2)
-lon2         = np.around(lon.max() + 2)
-
-if lon1 < -180:
-    lon1 = -180.0
-if lon2 > 180:
-    lon2 = 180.0    
-  
-# when encountering prime meridian, download global data
-# keeps interpolation simple          
-if lon1 == -180 or lon2 == 180:
-    lon1 = -180.
-    lon2 =  180.
-
-# domain for which ERA5 data is downloaded           
-domain  = [lat1, lat2, lon1, lon2]
+# domain for which ERA5 data is downloaded, 
+# two boxes if the scene crosses the antimeridian
+domain  = scene_domain(lat, lon)
 
 
 
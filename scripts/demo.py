@@ -19,6 +19,7 @@ import typhon.arts.xml as xml
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
 import shutil
+from era2dardar.utils.domain import scene_domain
 
 
 # pressure grid
@@ -66,25 +67,9 @@ for dardarfile in dardarfiles[1:10]:
         lon          = dardar.longitude 
         lat          = dardar.latitude
         
-        lat1         = np.around(lat.min() - 2)
-        lat2         = np.around(lat.max() + 2)
-        
-        lon1         = np.around(lon.min() - 2)
-        lon2         = np.around(lon.max() + 2)
-
-        if lon1 < -180:
-            lon1 = -180.0
-        if lon2 > 180:
-            lon2 = 180.0    
-
- # when encountering prime meridian, download global data
- # keeps interpolation simple          
-        if lon1 == -180 or lon2 == 180:
-            lon1 = -180.
-            lon2 =  180.
-            
- # domain for which ERA5 data is downloaded           
-        domain  = [lat1, lat2, lon1, lon2]
+        # domain for which ERA5 data is downloaded, 
+        # two boxes if the scene crosses the antimeridian
+        domain  = scene_domain(lat, lon)
         
         
 # get all atmfields as a directory
@@ -12,10 +12,16 @@ import glob
 import numpy as np
 import random
 from era2dardar.ERA5 import ERA5p, ERA5s
+from era2dardar.ERA5_cache import ERA5cache
+from era2dardar.ERA5_planner import scene_hours, plan_requests, band_domain, submit
+from era2dardar.ERA5_planner import scene_end
+from era2dardar.ERA5_prefetch import ERA5prefetch
 from era2dardar.dardar2atmdata import dardar2atmdata
+from era2dardar.atmData import atmdata
 from era2dardar.DARDAR import DARDARProduct
 from era2dardar.RADARLIDAR import DARDAR, CLOUDSAT
 from era2dardar.utils.alt2pressure import alt2pres
+from era2dardar.utils.domain import scene_domain
 import typhon.arts.xml as xml
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
@@ -34,9 +40,133 @@ def filename2date(filename):
         pattern = "%Y%j%H%M%S"
         return datetime.strptime(filename, pattern)
 
-def run_all_cases(p_grid, dardarfiles, cfiles, Nodes, latlims, inpath, outpath, year, month):
+def scenes(dardarfile, latlims, Nodes, temporal = False, granules = None):
+    """
+    times and ERA5 domains of the scenes of one granule, used for prefetching
     
-    for dardarfile, cfile in zip(dardarfiles, cfiles):
+    granules : dictionary, the split granule is stored under dardarfile to 
+               be reused by run_all_cases instead of being read again
+    """
+    dardar_nodes = split_granule(dardarfile, latlims, Nodes, granules)
+    return [(dardar.t_0, scene_end(dardar) if temporal else dardar.t_1, 
+             scene_domain(dardar.latitude, dardar.longitude)) 
+            for dardar in dardar_nodes.values()]
+
+def orbit_scene(dardarfile, latlims, Nodes, granules = None):
+    """
+    time and ERA5 domain of all nodes of one granule together, 
+    used for prefetching in orbit mode, see scenes for granules
+    """
+    dardar_nodes = split_granule(dardarfile, latlims, Nodes, granules)
+    if not dardar_nodes:
+        return []
+    orbit        = next(iter(dardar_nodes.values())).store
+    t_1          = max(scene_end(node) for node in dardar_nodes.values())
+    return [(orbit.t_0, t_1, 
+             scene_domain(orbit.latitude, orbit.longitude))]
+
+def split_granule(dardarfile, latlims, Nodes, granules = None):
+    """
+    DARDAR.split_nodes of a granule, stored in granules if given, 
+    the granule is closed by close_granule
+    """
+    dardar_nodes = DARDAR.split_nodes(dardarfile, latlims, Nodes)
+    if granules is not None:
+        granules[dardarfile] = dardar_nodes
+    return dardar_nodes
+
+def close_granule(dardar_nodes):
+    """
+    closes the file of a granule split by DARDAR.split_nodes, 
+    the nodes share the file of the orbit
+    """
+    for dardar in dardar_nodes.values():
+        dardar.store.close()
+        break
+
+def orbit_atm(dardar_nodes, cloudsat_nodes, p_grid, cache = None):
+    """
+    interpolates ERA5 and computes z_field once for the profiles of all 
+    nodes of a granule
+
+    Parameters
+    ----------
+    dardar_nodes : dictionary of DARDAR instances from DARDAR.split_nodes
+    cloudsat_nodes : dictionary of CLOUDSAT instances from 
+                     CLOUDSAT.split_nodes
+    p_grid : np.array, pressure grid [Pa]
+    cache : ERA5cache instance or None
+
+    Returns
+    -------
+    atmdata instance of the orbit, see atmdata.subset for the nodes
+
+    """
+    dardar   = next(iter(dardar_nodes.values())).store
+    cloudsat = next(iter(cloudsat_nodes.values())).store
+    
+    # the nodes of an orbit fall in different hours, the hours up to the 
+    # end of the last node are interpolated to the time of each profile, 
+    # as in run_all_cases with temporal = True
+    t_0    = dardar.t_0
+    t_1    = max(scene_end(node) for node in dardar_nodes.values())
+    domain = scene_domain(dardar.latitude, dardar.longitude)
+    eras   = ERA5s(t_0, t_1, variables_s, domain, cache = cache,
+                   temporal = True)  
+    erap   = ERA5p(t_0, t_1, variables_p, domain, cache = cache,
+                   temporal = True)     
+    
+    atm    = atmdata(dardar, cloudsat, erap, eras, p_grid, domain = domain)
+    
+    # fields used by dardar2atmdata
+    for name in ["temperature", "z_field", "clwc", "vmr_h2o", "vmr_N2",
+                 "vmr_O2", "vmr_O3", "skin_temperature", "t2m", 
+                 "wind_speed", "wind_direction", "lsm", "sea_ice_cover",
+                 "snow_depth", "z_surface_srtm", "z_surface", "N0star",
+                 "logp_dardar", "logp_cloudsat"]:
+        getattr(atm, name)
+    
+    return atm
+
+def run_all_cases(p_grid, dardarfiles, cfiles, Nodes, latlims, inpath, outpath, year, month,
+                  cache = None, prefetch = None, orbit = False, 
+                  temporal = False):
+    """
+    orbit : if True, ERA5 is interpolated once for all nodes of a granule 
+            and the fields are sliced per node, else once per node.
+            Requires temporal
+    temporal : if True, ERA5 is interpolated in time to each profile, 
+               else the hour containing t_0 of the node is used for all
+               its profiles. With temporal, the hours up to the last 
+               profile are used, and both modes give the same fields
+    """
+    if orbit and not temporal:
+        raise ValueError("orbit mode needs temporal = True, the nodes of "
+                         "an orbit fall in different ERA5 hours")
+    
+    cases = zip(dardarfiles, cfiles)
+    
+    # granules split for prefetching, reused by the loop
+    granules = {}
+    
+    # download ERA5 for the next granules while the current one is processed
+    if prefetch is not None:
+        if orbit:
+            cases = prefetch.run(cases, lambda case: orbit_scene(case[0], latlims, Nodes,
+                                                                 granules))
+        else:
+            cases = prefetch.run(cases, lambda case: scenes(case[0], latlims, Nodes,
+                                                            temporal, granules))
+    
+    for dardarfile, cfile in cases:
+        
+      # read each granule once for all nodes
+      dardar_nodes   = granules.pop(dardarfile, None)
+      if dardar_nodes is None:
+          dardar_nodes = DARDAR.split_nodes(dardarfile, latlims, Nodes)
+      cloudsat_nodes = CLOUDSAT.split_nodes(cfile, latlims, Nodes)
+      
+      atm_orbit      = None
         
       for N in Nodes:
           
@@ -51,8 +181,8 @@ def run_all_cases(p_grid, dardarfiles, cfiles, Nodes, latlims, inpath, outpath,
                 continue
             
             try:
-                dardar   = DARDAR(dardarfile, latlims = latlims, node = N)
-                cloudsat = CLOUDSAT(cfile, latlims = latlims, node = N)
+                dardar   = dardar_nodes[N]
+                cloudsat = cloudsat_nodes[N]
                 #dardar.plot_scene()
             except:
                 raise Exception("descending pass not available")
@@ -60,38 +190,30 @@ def run_all_cases(p_grid, dardarfiles, cfiles, Nodes, latlims, inpath, outpath,
             
             print ("t_0, t_1", dardar.t_0, dardar.t_1)
     
-            
-            lon          = dardar.longitude 
-            lat          = dardar.latitude
-            
-            lat1         = np.around(lat.min() - 2)
-            lat2         = np.around(lat.max() + 2)
-            
-            lon1         = np.around(lon.min() - 2)
-            lon2         = np.around(lon.max() + 2)
-    
-            if lon1 < -180:
-                lon1 = -180.0
-            if lon2 > 180:
-                lon2 = 180.0    
-      
-            # when encountering prime meridian, download global data
-            # keeps interpolation simple          
-            if lon1 == -180 or lon2 == 180:
-                lon1 = -180.
-                lon2 =  180.
+            if orbit:
+                # ERA5 is interpolated once for all nodes, when the first
+                # node not yet saved is reached
+                if atm_orbit is None:
+                    atm_orbit = orbit_atm(dardar_nodes, cloudsat_nodes, 
+                                          p_grid, cache = cache)
                 
-            # domain for which ERA5 data is downloaded           
-            domain  = [lat1, lat2, lon1, lon2]
- 
-
+                atm_fields = dardar2atmdata(dardar, cloudsat, None, None, 
+                                            p_grid, 
+                                            atm = atm_orbit.subset(dardar, 
+                                                                   cloudsat))
+            else:
+                # domain for which ERA5 data is downloaded, 
+                # two boxes if the scene crosses the antimeridian           
+                domain  = scene_domain(dardar.latitude, dardar.longitude)
      
-            eras = ERA5s(dardar.t_0, dardar.t_1, variables_s, domain)  
-            erap = ERA5p(dardar.t_0, dardar.t_1, variables_p, domain)     
-      
-            
-            # get all atmfields as a directory
-            atm_fields  = dardar2atmdata(dardar, cloudsat, erap, eras, p_grid, domain = domain)
+                t_1  = scene_end(dardar) if temporal else dardar.t_1
+                eras = ERA5s(dardar.t_0, t_1, variables_s, domain, cache = cache,
+                             temporal = temporal)  
+                erap = ERA5p(dardar.t_0, t_1, variables_p, domain, cache = cache,
+                             temporal = temporal)     
+          
+                # get all atmfields as a directory
+                atm_fields  = dardar2atmdata(dardar, cloudsat, erap, eras, p_grid, domain = domain)
             
             
             outdir = os.path.join(outpath, outdir)
@@ -114,14 +236,18 @@ def run_all_cases(p_grid, dardarfiles, cfiles, Nodes, latlims, inpath, outpath,
             shutil.rmtree(outdir)
             
      
-            # remove downloaded ERA files  
-            erafiles = (glob.glob(os.path.join("ERA5/*/", "*" 
-                                               + date.strftime("%4Y") 
-                                               + date.strftime("%2m") 
-                                               + date.strftime("%2d")  
-                                               + date.strftime("%2H") +"*")))
-            for f in erafiles:    
-                os.remove(f)         
+            # remove downloaded ERA files, 
+            # with a cache the files are kept for the next scenes 
+            if cache is None:
+                erafiles = (glob.glob(os.path.join("ERA5/*/", "*" 
+                                                   + date.strftime("%4Y") 
+                                                   + date.strftime("%2m") 
+                                                   + date.strftime("%2d")  
+                                                   + date.strftime("%2H") +"*")))
+                for f in erafiles:    
+                    os.remove(f)         
+      
+      close_granule(dardar_nodes)
         
 
 if __name__ == "__main__":
@@ -175,9 +301,34 @@ if __name__ == "__main__":
     outpath = os.path.expanduser("~/Dendrite/Projects/IWP/GMI/DARDAR_ERA_m65_p65_z_field")
     
     Nodes =  [ "A", "D_S", "D_N",  ]
+    
+    # ERA5 files are kept on disk up to 50 GB and shared between scenes
+    cache = ERA5cache("ERA5_cache", max_size = 50e9)
+    
+    # interpolate ERA5 once per granule and slice the fields per node,
+    # needs interpolation of ERA5 in time to the profiles, which changes
+    # the fields compared to the hour of t_0 used by default
+    orbit    = False
+    temporal = False
+    
+    # either download ERA5 for all scenes in bulk, one request per day for
+    # the latitude band of the scenes, or download in the background 
+    # two granules ahead 
+    bulk = False
+    prefetch = None
+    if bulk:
+        hours    = scene_hours(dardarfiles, latlims, Nodes, temporal = temporal)
+        requests = plan_requests(hours, domain = band_domain(latlims))
+        submit(requests, variables_p, variables_s, cache)
+    else:
+        prefetch = ERA5prefetch(cache, variables_p, variables_s, 
+                                lookahead = 2, max_size = 40e9)
+    
     # random shuffle dardarfiles
     random.shuffle(dardarfiles)
     
     # start the loop for all cases
     
-    run_all_cases(p_grid, dardarfiles, cfiles, Nodes, latlims, inpath, outpath, year, month)
\ No newline at end of file
+    run_all_cases(p_grid, dardarfiles, cfiles, Nodes, latlims, inpath, outpath, year, month,
+                  cache = cache, prefetch = prefetch, orbit = orbit,
+                  temporal = temporal)
\ No newline at end of file
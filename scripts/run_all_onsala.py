@@ -20,6 +20,7 @@ from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
 import shutil
+from era2dardar.utils.domain import scene_domain
 
 
 
@@ -44,25 +45,9 @@ def run_all_cases(p_grid, onsala, t0, outpath):
         lon          = onsala.longitude 
         lat          = onsala.latitude
         
-        lat1         = np.around(lat.min() - 1)
-        lat2         = np.around(lat.max() + 1)
-        
-        lon1         = np.around(lon.min() - 1)
-        lon2         = np.around(lon.max() + 1)
-
-        if lon1 < -180:
-            lon1 = -180.0
-        if lon2 > 180:
-            lon2 = 180.0    
-  
-        # when encountering prime meridian, download global data
-        # keeps interpolation simple          
-        if lon1 == -180 or lon2 == 180:
-            lon1 = -180.
-            lon2 =  180.
-            
-        # domain for which ERA5 data is downloaded           
-        domain  = [lat1, lat2, lon1, lon2]
+        # domain for which ERA5 data is downloaded, 
+        # two boxes if the scene crosses the antimeridian
+        domain  = scene_domain(lat, lon, pad = 1)
         
         # get all atmfields as a directory
         atm_fields  = onsala_atmdata(onsala, p_grid, domain = domain)
@@ -70,7 +70,7 @@ grid_q          = ERA_q.interpolate(dardar, p_grid = None)
 q2vmr           = thermodynamics.specific_humidity2vmr(grid_q)
 
 
-p_grid          = ERA_q.era["level"].data * 100 # Pa
+p_grid          = ERA_q.level * 100 # Pa
 grid_p          = np.tile(p_grid, (grid_t.shape[1], 1))
 grid_p          = grid_p.T 
 r2vmr           = rh2vmr(grid_p , grid_t, grid_r)